@@ -2,10 +2,14 @@
 Duplicate detection for orders, patients, and providers.
 """
 
+import operator
+from collections import defaultdict
 from dataclasses import dataclass, field
 from datetime import datetime
+from functools import reduce
 from typing import List, Optional
 
+from django.db.models import Q
 from django.db.models.functions import Lower
 
 from apps.patients.models import Patient
@@ -118,9 +122,9 @@ class ProviderDuplicateDetector:
 class PatientDuplicateDetector:
     """Detects duplicate patients based on MRN and demographics."""
 
-    @staticmethod
+    @classmethod
     def check(
-        mrn: str, first_name: str, last_name: str, date_of_birth=None
+        cls, mrn: str, first_name: str, last_name: str, date_of_birth=None
     ) -> DuplicateCheckResult:
         """
         Check for patient duplicates.
@@ -130,103 +134,13 @@ class PatientDuplicateDetector:
         - Same MRN + different fn/ln/dob -> WARN
         - Same fn + ln + dob, different MRN -> WARN (potential duplicate)
         """
-        warnings = []
-
         # Check exact MRN match
         try:
             existing = Patient.objects.get(mrn=mrn)
-
-            # MRN found - check if names and DOB match
-            names_match = (
-                existing.first_name.lower().strip() == first_name.lower().strip()
-                and existing.last_name.lower().strip() == last_name.lower().strip()
-            )
-            dob_match = (
-                date_of_birth is None
-                or existing.date_of_birth is None
-                or existing.date_of_birth == date_of_birth
-            )
-
-            if names_match and dob_match:
-                warnings.append(
-                    Warning(
-                        code="PATIENT_EXISTS",
-                        message=f"Patient with MRN {mrn} already exists. Using existing record.",
-                        action_required=False,
-                    )
-                )
-            elif not names_match and not dob_match:
-                # Both name and DOB mismatch - WARNING (can confirm)
-                warnings.append(
-                    Warning(
-                        code="PATIENT_DATA_MISMATCH",
-                        message=f"Patient MRN {mrn} exists with name "
-                        f"'{existing.first_name} {existing.last_name}' (DOB: {existing.date_of_birth}), "
-                        f"but input is '{first_name} {last_name}' (DOB: {date_of_birth}). Please verify.",
-                        action_required=True,
-                        data={
-                            "existing_name": f"{existing.first_name} {existing.last_name}",
-                            "existing_dob": str(existing.date_of_birth)
-                            if existing.date_of_birth
-                            else None,
-                        },
-                    )
-                )
-                return DuplicateCheckResult(
-                    is_duplicate=True,
-                    is_potential_duplicate=True,  # This triggers WARNING flow
-                    existing_record=existing,
-                    warnings=warnings,
-                )
-            elif not names_match:
-                # Name mismatch - WARNING (can confirm)
-                warnings.append(
-                    Warning(
-                        code="PATIENT_NAME_MISMATCH",
-                        message=f"Patient MRN {mrn} exists with name "
-                        f"'{existing.first_name} {existing.last_name}', "
-                        f"but input name is '{first_name} {last_name}'. Please verify.",
-                        action_required=True,
-                        data={"existing_name": f"{existing.first_name} {existing.last_name}"},
-                    )
-                )
-                return DuplicateCheckResult(
-                    is_duplicate=True,
-                    is_potential_duplicate=True,  # This triggers WARNING flow
-                    existing_record=existing,
-                    warnings=warnings,
-                )
-            else:
-                # DOB mismatch only - WARNING (can confirm)
-                warnings.append(
-                    Warning(
-                        code="PATIENT_DOB_MISMATCH",
-                        message=f"Patient MRN {mrn} exists with DOB {existing.date_of_birth}, "
-                        f"but input DOB is {date_of_birth}. Please verify.",
-                        action_required=True,
-                        data={
-                            "existing_dob": str(existing.date_of_birth)
-                            if existing.date_of_birth
-                            else None,
-                        },
-                    )
-                )
-                return DuplicateCheckResult(
-                    is_duplicate=True,
-                    is_potential_duplicate=True,  # This triggers WARNING flow
-                    existing_record=existing,
-                    warnings=warnings,
-                )
-
-            # names_match and dob_match - use existing patient
-            return DuplicateCheckResult(
-                is_duplicate=True,
-                existing_record=existing,
-                warnings=warnings,
-            )
-
         except Patient.DoesNotExist:
             pass
+        else:
+            return cls._existing_mrn_result(existing, mrn, first_name, last_name, date_of_birth)
 
         # Check for same name + DOB with different MRN
         if date_of_birth:
@@ -241,22 +155,7 @@ class PatientDuplicateDetector:
             )
 
             if potential:
-                warnings.append(
-                    Warning(
-                        code="PATIENT_POSSIBLE_DUPLICATE",
-                        message=f"A patient with the same name and date of birth exists "
-                        f"with MRN {potential.mrn}. Please verify this is a different patient.",
-                        action_required=True,
-                        data={
-                            "existing_mrn": potential.mrn,
-                            "existing_name": f"{potential.first_name} {potential.last_name}",
-                        },
-                    )
-                )
-                return DuplicateCheckResult(
-                    is_potential_duplicate=True,
-                    warnings=warnings,
-                )
+                return cls._possible_duplicate_result(potential)
 
         # Check for exact name match (without DOB)
         name_matches = Patient.objects.filter(
@@ -265,26 +164,200 @@ class PatientDuplicateDetector:
         ).exclude(mrn=mrn)[:5]
 
         if name_matches.exists():
+            return cls._similar_name_result(list(name_matches))
+
+        return DuplicateCheckResult()
+
+    @classmethod
+    def check_bulk(cls, records: List[dict]) -> List[DuplicateCheckResult]:
+        """
+        Check a batch of patients (e.g. a CSV import) with two queries in total.
+
+        Each record is a dict with ``mrn``, ``first_name``, ``last_name`` and an
+        optional ``date_of_birth``. Returns one result per record, in input
+        order, matching what ``check`` would return for it.
+        """
+        if not records:
+            return []
+
+        by_mrn = Patient.objects.in_bulk({r["mrn"] for r in records}, field_name="mrn")
+
+        names = {(r["first_name"].lower(), r["last_name"].lower()) for r in records}
+        name_filter = reduce(
+            operator.or_,
+            (Q(first_name__iexact=fn, last_name__iexact=ln) for fn, ln in names),
+        )
+        by_name = defaultdict(list)
+        for patient in Patient.objects.filter(name_filter):
+            by_name[(patient.first_name.lower(), patient.last_name.lower())].append(patient)
+
+        return [cls._match_from_preload(record, by_mrn, by_name) for record in records]
+
+    @classmethod
+    def _match_from_preload(cls, record: dict, by_mrn: dict, by_name: dict) -> DuplicateCheckResult:
+        """Apply the ``check`` rules to one record using preloaded patients."""
+        mrn = record["mrn"]
+        first_name = record["first_name"]
+        last_name = record["last_name"]
+        date_of_birth = record.get("date_of_birth")
+
+        existing = by_mrn.get(mrn)
+        if existing is not None:
+            return cls._existing_mrn_result(existing, mrn, first_name, last_name, date_of_birth)
+
+        name_matches = [
+            p for p in by_name.get((first_name.lower(), last_name.lower()), []) if p.mrn != mrn
+        ]
+
+        if date_of_birth:
+            potential = next((p for p in name_matches if p.date_of_birth == date_of_birth), None)
+            if potential:
+                return cls._possible_duplicate_result(potential)
+
+        if name_matches:
+            return cls._similar_name_result(name_matches[:5])
+
+        return DuplicateCheckResult()
+
+    @staticmethod
+    def _existing_mrn_result(
+        existing: Patient, mrn: str, first_name: str, last_name: str, date_of_birth=None
+    ) -> DuplicateCheckResult:
+        """Compare the input against the patient already registered under ``mrn``."""
+        warnings = []
+
+        # MRN found - check if names and DOB match
+        names_match = (
+            existing.first_name.lower().strip() == first_name.lower().strip()
+            and existing.last_name.lower().strip() == last_name.lower().strip()
+        )
+        dob_match = (
+            date_of_birth is None
+            or existing.date_of_birth is None
+            or existing.date_of_birth == date_of_birth
+        )
+
+        if names_match and dob_match:
             warnings.append(
                 Warning(
-                    code="PATIENT_SIMILAR_NAME",
-                    message=f"Found {name_matches.count()} patient(s) with the same name. "
-                    f"Please verify this is a new patient.",
+                    code="PATIENT_EXISTS",
+                    message=f"Patient with MRN {mrn} already exists. Using existing record.",
                     action_required=False,
+                )
+            )
+        elif not names_match and not dob_match:
+            # Both name and DOB mismatch - WARNING (can confirm)
+            warnings.append(
+                Warning(
+                    code="PATIENT_DATA_MISMATCH",
+                    message=f"Patient MRN {mrn} exists with name "
+                    f"'{existing.first_name} {existing.last_name}' (DOB: {existing.date_of_birth}), "
+                    f"but input is '{first_name} {last_name}' (DOB: {date_of_birth}). Please verify.",
+                    action_required=True,
                     data={
-                        "similar_patients": [
-                            {"mrn": p.mrn, "dob": str(p.date_of_birth) if p.date_of_birth else None}
-                            for p in name_matches
-                        ]
+                        "existing_name": f"{existing.first_name} {existing.last_name}",
+                        "existing_dob": str(existing.date_of_birth)
+                        if existing.date_of_birth
+                        else None,
                     },
                 )
             )
             return DuplicateCheckResult(
-                is_potential_duplicate=True,
+                is_duplicate=True,
+                is_potential_duplicate=True,  # This triggers WARNING flow
+                existing_record=existing,
+                warnings=warnings,
+            )
+        elif not names_match:
+            # Name mismatch - WARNING (can confirm)
+            warnings.append(
+                Warning(
+                    code="PATIENT_NAME_MISMATCH",
+                    message=f"Patient MRN {mrn} exists with name "
+                    f"'{existing.first_name} {existing.last_name}', "
+                    f"but input name is '{first_name} {last_name}'. Please verify.",
+                    action_required=True,
+                    data={"existing_name": f"{existing.first_name} {existing.last_name}"},
+                )
+            )
+            return DuplicateCheckResult(
+                is_duplicate=True,
+                is_potential_duplicate=True,  # This triggers WARNING flow
+                existing_record=existing,
+                warnings=warnings,
+            )
+        else:
+            # DOB mismatch only - WARNING (can confirm)
+            warnings.append(
+                Warning(
+                    code="PATIENT_DOB_MISMATCH",
+                    message=f"Patient MRN {mrn} exists with DOB {existing.date_of_birth}, "
+                    f"but input DOB is {date_of_birth}. Please verify.",
+                    action_required=True,
+                    data={
+                        "existing_dob": str(existing.date_of_birth)
+                        if existing.date_of_birth
+                        else None,
+                    },
+                )
+            )
+            return DuplicateCheckResult(
+                is_duplicate=True,
+                is_potential_duplicate=True,  # This triggers WARNING flow
+                existing_record=existing,
                 warnings=warnings,
             )
 
-        return DuplicateCheckResult()
+        # names_match and dob_match - use existing patient
+        return DuplicateCheckResult(
+            is_duplicate=True,
+            existing_record=existing,
+            warnings=warnings,
+        )
+
+    @staticmethod
+    def _possible_duplicate_result(potential: Patient) -> DuplicateCheckResult:
+        """Same name and DOB already registered under a different MRN."""
+        warnings = []
+        warnings.append(
+            Warning(
+                code="PATIENT_POSSIBLE_DUPLICATE",
+                message=f"A patient with the same name and date of birth exists "
+                f"with MRN {potential.mrn}. Please verify this is a different patient.",
+                action_required=True,
+                data={
+                    "existing_mrn": potential.mrn,
+                    "existing_name": f"{potential.first_name} {potential.last_name}",
+                },
+            )
+        )
+        return DuplicateCheckResult(
+            is_potential_duplicate=True,
+            warnings=warnings,
+        )
+
+    @staticmethod
+    def _similar_name_result(name_matches: List[Patient]) -> DuplicateCheckResult:
+        """Same name (ignoring DOB) already registered under other MRNs."""
+        warnings = []
+        warnings.append(
+            Warning(
+                code="PATIENT_SIMILAR_NAME",
+                message=f"Found {len(name_matches)} patient(s) with the same name. "
+                f"Please verify this is a new patient.",
+                action_required=False,
+                data={
+                    "similar_patients": [
+                        {"mrn": p.mrn, "dob": str(p.date_of_birth) if p.date_of_birth else None}
+                        for p in name_matches
+                    ]
+                },
+            )
+        )
+        return DuplicateCheckResult(
+            is_potential_duplicate=True,
+            warnings=warnings,
+        )
 
 
 class OrderDuplicateDetector:
@@ -318,6 +391,7 @@ class OrderDuplicateDetector:
                 patient_id=patient_id,
                 medication_name__iexact=medication_name.strip(),
             )
+            .only("id", "created_at", "status")
             .order_by("-created_at")
             .first()
         )
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-16 12:44
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("orders", "0001_initial"),
+        ("patients", "0001_initial"),
+        ("providers", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="order",
+            index=models.Index(
+                models.F("patient"),
+                django.db.models.functions.text.Upper("medication_name"),
+                models.OrderBy(models.F("created_at"), descending=True),
+                name="ord_pat_med_ctd_idx",
+            ),
+        ),
+    ]
@@ -5,6 +5,7 @@ Order model.
 import uuid
 
 from django.db import models
+from django.db.models.functions import Upper
 
 from apps.patients.models import Patient
 from apps.providers.models import Provider
@@ -85,6 +86,13 @@ class Order(models.Model):
             models.Index(fields=["status"]),
             models.Index(fields=["duplicate_check_hash"]),
             models.Index(fields=["-created_at"]),
+            # Serves OrderDuplicateDetector: patient + medication__iexact, newest first
+            models.Index(
+                "patient",
+                Upper("medication_name"),
+                models.F("created_at").desc(),
+                name="ord_pat_med_ctd_idx",
+            ),
         ]
     
     def __str__(self):
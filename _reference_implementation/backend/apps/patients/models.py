@@ -5,6 +5,7 @@ Patient models.
 import uuid
 
 from django.db import models
+from django.db.models.functions import Upper
 
 from apps.core.validators import validate_icd10, validate_mrn
 
@@ -84,6 +85,8 @@ class Patient(models.Model):
             models.Index(fields=["mrn"]),
             models.Index(fields=["last_name", "first_name"]),
             models.Index(fields=["primary_diagnosis_code"]),
+            # Serves PatientDuplicateDetector's first_name/last_name__iexact lookups
+            models.Index(Upper("last_name"), Upper("first_name"), name="pat_name_upper_idx"),
         ]
     
     def __str__(self):
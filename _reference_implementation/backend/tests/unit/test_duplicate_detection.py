@@ -26,7 +26,7 @@ class TestOrderDuplicateDetector:
         mock_order.status = "completed"
 
         with patch("apps.orders.duplicate_detection.Order.objects") as mock_objects:
-            mock_objects.filter.return_value.order_by.return_value.first.return_value = mock_order
+            mock_objects.filter.return_value.only.return_value.order_by.return_value.first.return_value = mock_order
 
             result = OrderDuplicateDetector.check(
                 patient_id="patient-123",
@@ -46,7 +46,7 @@ class TestOrderDuplicateDetector:
         mock_order.status = "completed"
 
         with patch("apps.orders.duplicate_detection.Order.objects") as mock_objects:
-            mock_objects.filter.return_value.order_by.return_value.first.return_value = mock_order
+            mock_objects.filter.return_value.only.return_value.order_by.return_value.first.return_value = mock_order
 
             result = OrderDuplicateDetector.check(
                 patient_id="patient-123",
@@ -66,7 +66,7 @@ class TestOrderDuplicateDetector:
         mock_order.status = "completed"
 
         with patch("apps.orders.duplicate_detection.Order.objects") as mock_objects:
-            mock_objects.filter.return_value.order_by.return_value.first.return_value = mock_order
+            mock_objects.filter.return_value.only.return_value.order_by.return_value.first.return_value = mock_order
 
             result = OrderDuplicateDetector.check(
                 patient_id="patient-123",
@@ -82,7 +82,7 @@ class TestOrderDuplicateDetector:
     def test_no_duplicate_returns_empty_result(self):
         """No duplicate orders should return empty result."""
         with patch("apps.orders.duplicate_detection.Order.objects") as mock_objects:
-            mock_objects.filter.return_value.order_by.return_value.first.return_value = None
+            mock_objects.filter.return_value.only.return_value.order_by.return_value.first.return_value = None
 
             result = OrderDuplicateDetector.check(
                 patient_id="patient-123",
@@ -320,6 +320,74 @@ class TestPatientDuplicateDetector:
             assert result.should_block is False
             assert len(result.warnings) == 0
 
+    def test_check_bulk_matches_check_per_record(self):
+        """check_bulk should give each record the same result check would."""
+        from datetime import date
+
+        by_mrn_patient = MagicMock()
+        by_mrn_patient.mrn = "123456"
+        by_mrn_patient.first_name = "John"
+        by_mrn_patient.last_name = "Doe"
+        by_mrn_patient.date_of_birth = None
+
+        same_name_dob = MagicMock()
+        same_name_dob.mrn = "999999"
+        same_name_dob.first_name = "Mary"
+        same_name_dob.last_name = "Major"
+        same_name_dob.date_of_birth = date(1990, 1, 15)
+
+        with patch("apps.orders.duplicate_detection.Patient.objects") as mock_objects:
+            mock_objects.in_bulk.return_value = {"123456": by_mrn_patient}
+            mock_objects.filter.return_value = [by_mrn_patient, same_name_dob]
+
+            results = PatientDuplicateDetector.check_bulk(
+                [
+                    {"mrn": "123456", "first_name": "John", "last_name": "Doe"},
+                    {"mrn": "123456", "first_name": "Jane", "last_name": "Doe"},
+                    {
+                        "mrn": "222222",
+                        "first_name": "mary",
+                        "last_name": "MAJOR",
+                        "date_of_birth": date(1990, 1, 15),
+                    },
+                    {
+                        "mrn": "333333",
+                        "first_name": "Mary",
+                        "last_name": "Major",
+                        "date_of_birth": date(1985, 6, 20),
+                    },
+                    {
+                        "mrn": "444444",
+                        "first_name": "New",
+                        "last_name": "Person",
+                        "date_of_birth": date(2000, 1, 1),
+                    },
+                ]
+            )
+
+            # One MRN lookup and one name lookup for the whole batch
+            mock_objects.in_bulk.assert_called_once()
+            mock_objects.filter.assert_called_once()
+            mock_objects.get.assert_not_called()
+
+        assert [r.warnings[0].code if r.warnings else None for r in results] == [
+            "PATIENT_EXISTS",
+            "PATIENT_NAME_MISMATCH",
+            "PATIENT_POSSIBLE_DUPLICATE",
+            "PATIENT_SIMILAR_NAME",
+            None,
+        ]
+        assert results[0].existing_record == by_mrn_patient
+        assert results[2].warnings[0].data["existing_mrn"] == "999999"
+        assert results[4].is_potential_duplicate is False
+
+    def test_check_bulk_empty_batch_skips_queries(self):
+        """An empty batch should not touch the database."""
+        with patch("apps.orders.duplicate_detection.Patient.objects") as mock_objects:
+            assert PatientDuplicateDetector.check_bulk([]) == []
+            mock_objects.in_bulk.assert_not_called()
+            mock_objects.filter.assert_not_called()
+
 
 class TestCarePlanPerMedication:
     """Tests for care plan per medication design."""
@@ -332,7 +400,7 @@ class TestCarePlanPerMedication:
         mock_order.status = "completed"
 
         with patch("apps.orders.duplicate_detection.Order.objects") as mock_objects:
-            mock_objects.filter.return_value.order_by.return_value.first.return_value = mock_order
+            mock_objects.filter.return_value.only.return_value.order_by.return_value.first.return_value = mock_order
 
             result = OrderDuplicateDetector.check(
                 patient_id="patient-123",
@@ -346,7 +414,7 @@ class TestCarePlanPerMedication:
         """Different medication for same patient on same day should allow."""
         with patch("apps.orders.duplicate_detection.Order.objects") as mock_objects:
             # No existing order with this medication
-            mock_objects.filter.return_value.order_by.return_value.first.return_value = None
+            mock_objects.filter.return_value.only.return_value.order_by.return_value.first.return_value = None
 
             result = OrderDuplicateDetector.check(
                 patient_id="patient-123",
@@ -0,0 +1,30 @@
+# backend/careplan_backend/log_queue.py
+"""
+异步日志 Handler
+===============
+调用 logger.exception() 的线程只把 LogRecord 放进内存队列就返回，
+格式化（包括 traceback）和真正的输出都在 QueueListener 的后台线程里做。
+LLM 挂掉时每次重试都会打一条带 traceback 的日志，不能让它卡住 worker。
+"""
+import atexit
+import logging
+import queue
+from logging.handlers import QueueHandler, QueueListener
+
+
+class AsyncConsoleHandler(QueueHandler):
+
+    def __init__(self, fmt='%(asctime)s %(levelname)s %(name)s: %(message)s'):
+        log_queue = queue.SimpleQueue()
+        super().__init__(log_queue)
+
+        console = logging.StreamHandler()
+        console.setFormatter(logging.Formatter(fmt))
+        self._listener = QueueListener(log_queue, console, respect_handler_level=True)
+        self._listener.start()
+        atexit.register(self._listener.stop)
+
+    def prepare(self, record):
+        # 默认的 prepare 会在调用方线程 format 一遍（包括 traceback），这里跳过，
+        # 同进程内的队列可以直接传原始 record，交给 listener 线程去格式化
+        return record
@@ -24,6 +24,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',  # ArrayField / GinIndex 等 Postgres 专属功能
     # 第三方
     'rest_framework',   # Django REST Framework，帮你快速写 API
     'corsheaders',      # 处理跨域请求（前端 3000 端口 → 后端 8000 端口）
@@ -94,6 +95,9 @@ REST_FRAMEWORK = {
         'rest_framework.renderers.BrowsableAPIRenderer', # 浏览器访问时显示漂亮的 API 界面
     ],
     'EXCEPTION_HANDLER': 'orders.exception_handler.unified_exception_handler',
+    # 列表接口分页：一次最多返回 50 条（?page=2 翻页），响应大小和内存不随订单总数增长
+    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
+    'PAGE_SIZE': 50,
 }
 
 LANGUAGE_CODE = 'en-us'
@@ -120,3 +124,43 @@ CELERY_BROKER_URL = REDIS_URL  # 复用你已有的 Redis 连接
 CELERY_RESULT_BACKEND = REDIS_URL
 
 LLM_PROVIDER = os.environ.get("LLM_PROVIDER", "gemini")  # 默认用 gemini
+
+# ---- Django 缓存（LLM 结果缓存用）----
+# Django 自带的 RedisCache，底层用 requirements 里已有的 redis 包
+# 每个进程的 Redis 连接上限；用 BlockingConnectionPool，连接用满时排队等（最多 5 秒），不会无限开新连接
+REDIS_MAX_CONNECTIONS = int(os.environ.get('REDIS_MAX_CONNECTIONS', 50))
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': REDIS_URL,
+        'OPTIONS': {
+            'pool_class': 'redis.BlockingConnectionPool',
+            'max_connections': REDIS_MAX_CONNECTIONS,
+            'timeout': 5,
+        },
+    }
+}
+CARE_PLAN_CACHE_TIMEOUT = int(os.environ.get('CARE_PLAN_CACHE_TIMEOUT', 86400))  # 秒，默认 1 天
+
+# ---- Care plan 攒批（micro-batching）----
+# 订单先进 Redis 列表，攒够 BATCH_SIZE 个或等满 BATCH_WINDOW 秒，合成一个 batch task 并发调 LLM
+CARE_PLAN_BATCH_SIZE = int(os.environ.get('CARE_PLAN_BATCH_SIZE', 16))
+CARE_PLAN_BATCH_WINDOW = float(os.environ.get('CARE_PLAN_BATCH_WINDOW', 0.2))
+
+# ============================================================
+# 日志：异步输出（见 careplan_backend/log_queue.py）
+# ============================================================
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'async_console': {
+            'class': 'careplan_backend.log_queue.AsyncConsoleHandler',
+        },
+    },
+    'root': {
+        'handlers': ['async_console'],
+        'level': 'INFO',
+    },
+}
@@ -1,52 +1,145 @@
+import hashlib
+import logging
 from abc import ABC, abstractmethod
 
-class BaseLLMAdapter(ABC):
-    
-    def generate_care_plan(self, order) -> str:
-        prompt = self._build_prompt(order)
-        return self._call_api(prompt)
-    
-    def _build_prompt(self, order) -> str:
-        """调用 Google Gemini API 生成 Care Plan（同步）"""
-        prompt = f"""You are a clinical pharmacist creating a care plan for a specialty pharmacy patient.
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+
+# ============================================================
+# 固定的 system prompt（静态前缀）
+# ============================================================
+# 所有订单都一样的部分放最前面，患者信息（动态部分）放在后面的 user 消息里
+CARE_PLAN_SYSTEM_PROMPT = """You are a clinical pharmacist creating a care plan for a specialty pharmacy patient.
+
+Please generate a comprehensive pharmaceutical care plan with EXACTLY these four sections:
+
+1. **Problem List / Drug Therapy Problems (DTPs)**
+- Identify potential drug therapy problems related to the prescribed medication and diagnoses
+
+2. **Goals (SMART format)**
+- Specific, Measurable, Achievable, Relevant, Time-bound goals for this patient
+
+3. **Pharmacist Interventions / Plan**
+- Specific actions the pharmacist should take
+- Patient education points
+- Coordination with the prescribing provider
+
+4. **Monitoring Plan & Lab Schedule**
+- Labs to monitor and frequency
+- Clinical parameters to track
+- Follow-up schedule
 
-    Patient Information:
-    - Name: {order.patient.first_name} {order.patient.last_name}
-    - Date of Birth: {order.patient.dob}
-    - MRN: {order.patient.mrn}
+Be specific and clinically relevant to the medication and diagnoses provided."""
 
-    Provider: {order.provider.name} (NPI: {order.provider.npi})
 
-    Medication: {order.medication_name}
-    Primary Diagnosis (ICD-10): {order.primary_diagnosis}
-    Additional Diagnoses: {', '.join(order.additional_diagnoses) if order.additional_diagnoses else 'None'}
-    Medication History: {', '.join(order.medication_history) if order.medication_history else 'None'}
-    Patient Records/Notes: {order.patient_records if order.patient_records else 'None provided'}
+# 患者部分的模板：模块加载时解析一次，绑定好的 str.format 直接调用
+_PATIENT_PROMPT = """Patient Information:
+- Name: {first_name} {last_name}
+- Date of Birth: {dob}
+- MRN: {mrn}
 
-    Please generate a comprehensive pharmaceutical care plan with EXACTLY these four sections:
+Provider: {provider_name} (NPI: {provider_npi})
 
-    1. **Problem List / Drug Therapy Problems (DTPs)**
-    - Identify potential drug therapy problems related to the prescribed medication and diagnoses
+Medication: {medication_name}
+Primary Diagnosis (ICD-10): {primary_diagnosis}
+Additional Diagnoses: {additional_diagnoses}
+Medication History: {medication_history}
+Patient Records/Notes: {patient_records}""".format
 
-    2. **Goals (SMART format)**
-    - Specific, Measurable, Achievable, Relevant, Time-bound goals for this patient
 
-    3. **Pharmacist Interventions / Plan**
-    - Specific actions the pharmacist should take
-    - Patient education points
-    - Coordination with the prescribing provider
+def build_care_plan_prompt(order) -> str:
+    """
+    只拼动态的患者部分；固定的指令在 CARE_PLAN_SYSTEM_PROMPT 里，
+    作为 system instruction 单独传，每次请求逐字节相同，能命中 provider 侧的前缀缓存
+    """
+    return _PATIENT_PROMPT(
+        first_name=order.patient.first_name,
+        last_name=order.patient.last_name,
+        dob=order.patient.dob,
+        mrn=order.patient.mrn,
+        provider_name=order.provider.name,
+        provider_npi=order.provider.npi,
+        medication_name=order.medication_name,
+        primary_diagnosis=order.primary_diagnosis,
+        additional_diagnoses=', '.join(order.additional_diagnoses or ()) or 'None',
+        medication_history=', '.join(order.medication_history or ()) or 'None',
+        patient_records=order.patient_records or 'None provided',
+    )
 
-    4. **Monitoring Plan & Lab Schedule**
-    - Labs to monitor and frequency
-    - Clinical parameters to track
-    - Follow-up schedule
 
-    Be specific and clinically relevant to the medication and diagnoses provided."""
-        
-        return prompt
+def care_plan_cache_key(order) -> str:
+    """
+    结果缓存的 key：对整段 prompt（system 指令 + 患者部分）做哈希
+    prompt 里有患者姓名 / DOB / MRN 和 provider，生成的 care plan 会写上这些信息，
+    所以不能只按临床字段复用：同药同诊断的另一个患者会拿到写着别人名字的 care plan
+    只有输入完全一样（同一个订单重试、重复投递）才会命中
+    """
+    prompt = f"{CARE_PLAN_SYSTEM_PROMPT}\n\n{build_care_plan_prompt(order)}"
+    return f"careplan:{hashlib.sha256(prompt.encode('utf-8')).hexdigest()}"
+
+
+class BaseLLMAdapter(ABC):
+    
+    def generate_care_plan(self, order) -> str:
+        # 先查 Redis：命中就是一次 GET（毫秒级），不用再等几秒的 LLM 调用
+        key = care_plan_cache_key(order)
+        try:
+            cached = cache.get(key)
+        except Exception as e:
+            logger.warning("Care plan cache unavailable: %s", e)
+            cached = None
+        if cached is not None:
+            return cached
+
+        prompt = self.build_prompt(order)
+        content = self._call_api(prompt)
+
+        # 只缓存成功的结果（None 表示调用失败，要让 Celery 重试）
+        if content is not None:
+            try:
+                cache.set(key, content, timeout=settings.CARE_PLAN_CACHE_TIMEOUT)
+            except Exception as e:
+                logger.warning("Care plan cache unavailable: %s", e)
+        return content
+    
+    def cached_care_plans(self, orders):
+        """一次 MGET 查缓存，返回 (keys, results)；没命中的位置是 None"""
+        keys = [care_plan_cache_key(order) for order in orders]
+        try:
+            cached = cache.get_many(keys)
+        except Exception as e:
+            logger.warning("Care plan cache unavailable: %s", e)
+            cached = {}
+        return keys, [cached.get(key) for key in keys]
+
+    def store_care_plans(self, fresh: dict):
+        """{cache key: content}，只放成功的结果"""
+        if not fresh:
+            return
+        try:
+            cache.set_many(fresh, timeout=settings.CARE_PLAN_CACHE_TIMEOUT)
+        except Exception as e:
+            logger.warning("Care plan cache unavailable: %s", e)
+
+    def build_prompt(self, order) -> str:
+        return build_care_plan_prompt(order)
+
+    def generate_from_prompts(self, prompts: list) -> list:
+        """
+        已经拼好的 prompt 直接调 LLM，不查缓存也不读数据库（llm_io worker 用这个）
+        返回和 prompts 一一对应的结果列表（失败的位置是 None）
+        """
+        return self._call_api_many(prompts)
 
 
     @abstractmethod
     def _call_api(self, prompt: str) -> str:
         # 每个子类必须实现自己的 API 调用
-        pass
\ No newline at end of file
+        pass
+
+    def _call_api_many(self, prompts: list) -> list:
+        # 默认逐个调用；支持并发的子类（Gemini）可以覆盖
+        return [self._call_api(prompt) for prompt in prompts]
\ No newline at end of file
@@ -1,15 +1,63 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 
 import google.generativeai as genai
 from django.conf import settings
-from .base import BaseLLMAdapter
+from .base import BaseLLMAdapter, CARE_PLAN_SYSTEM_PROMPT
+
+logger = logging.getLogger(__name__)
+
+
+def _under_gevent():
+    """当前进程是不是 gevent worker（-P gevent 启动时 socket 已经被 monkey-patch）"""
+    try:
+        from gevent import monkey
+    except ImportError:
+        return False
+    return monkey.is_module_patched('socket')
+
+
+@lru_cache(maxsize=1)
+def _get_gemini_model():
+    """
+    每个 worker 进程只 configure + 创建一次 model，
+    之后所有 task 共用同一个 client（HTTP 连接也能复用）
+    gevent worker 走 REST：grpc 的 C 扩展不会跟着 gevent 让出，requests 的 socket 会
+    """
+    if _under_gevent():
+        genai.configure(api_key=settings.GOOGLE_API_KEY, transport='rest')
+    else:
+        genai.configure(api_key=settings.GOOGLE_API_KEY)
+    return genai.GenerativeModel(
+        'gemini-flash-latest',
+        system_instruction=CARE_PLAN_SYSTEM_PROMPT,   # 静态指令，prompt 只剩患者信息
+    )
+
 
 class GeminiAdapter(BaseLLMAdapter):
     def _call_api(self, prompt: str) -> str:
         try:
-            genai.configure(api_key=settings.GOOGLE_API_KEY)
-            model = genai.GenerativeModel('gemini-flash-latest')
-            response = model.generate_content(prompt)
-            return response.text
+            model = _get_gemini_model()
+            # stream=True：边生成边收 chunk，不用等服务端把整段攒完再一次性返回
+            response = model.generate_content(prompt, stream=True)
+            return ''.join(chunk.text for chunk in response)
         except Exception as e:
-            print(f"❌ Gemini Error: {e}")
-            return None
\ No newline at end of file
+            logger.exception("Gemini error: %s", e)
+            return None
+
+    def _call_api_many(self, prompts: list) -> list:
+        """
+        一批 prompt 在同一个 client 上并发发出去，总耗时约等于最慢的那一个
+        都走同步的 _call_api（每个 prompt 自己 try/except，失败只让自己的位置变成 None）：
+        - gevent worker：每个 prompt 一个 greenlet，socket 被 patch 过，等响应时会让出
+        - prefork worker：线程池，等网络时释放 GIL。不用 asyncio.run + generate_content_async：
+          缓存的 model 里的 grpc.aio client 绑在第一次的事件循环上，之后每批都会报 loop 错误
+        """
+        if not prompts:
+            return []
+        if _under_gevent():
+            from gevent.pool import Group
+            return Group().map(self._call_api, prompts)
+        with ThreadPoolExecutor(max_workers=len(prompts)) as pool:
+            return list(pool.map(self._call_api, prompts))
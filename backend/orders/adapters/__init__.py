@@ -4,15 +4,17 @@ from .clinic_b import ClinicBAdapter
 from .pharmacorp import PharmaCorpAdapter
 from .nordic import NordicHealthAdapter
 
+# source → adapter 类；模块加载时建一次，每个请求只做一次 dict 查找
+_ADAPTERS = {
+    "cvs_web": CvsWebAdapter,
+    "clinic_b": ClinicBAdapter,
+    "pharmacorp": PharmaCorpAdapter,
+    "nordic": NordicHealthAdapter,
+}
+
 def get_adapter(source: str):
     """工厂函数：根据数据来源返回对应的 adapter"""
-    adapters = {
-        "cvs_web": CvsWebAdapter,
-        "clinic_b": ClinicBAdapter,
-        "pharmacorp": PharmaCorpAdapter,
-        "nordic": NordicHealthAdapter,
-    }
-    adapter_class = adapters.get(source)
+    adapter_class = _ADAPTERS.get(source)
     if not adapter_class:
-        raise ValueError(f"Unknown source: '{source}'. Available: {list(adapters.keys())}")
+        raise ValueError(f"Unknown source: '{source}'. Available: {list(_ADAPTERS)}")
     return adapter_class()
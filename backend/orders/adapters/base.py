@@ -1,24 +1,27 @@
 from abc import ABC, abstractmethod
-from dataclasses import dataclass, field, asdict
-from typing import List, Optional
+from dataclasses import dataclass, field
+from typing import List, Optional, Union
 from datetime import date
 
 
 # ===== 内部标准格式 =====
+# slots=True：实例没有 __dict__，每个请求都会建一组，省内存也省属性查找
 
-@dataclass
+@dataclass(slots=True)
 class InternalPatient:
     first_name: str
     last_name: str
     mrn: str
-    dob: str                    # "YYYY-MM-DD" 字符串，因为 serializer 期望字符串再自己转
+    # serializer 路径：DRF 已经解析好的 date，直接交给 ORM 绑定成 DATE 参数，不再 str() 一遍
+    # adapter 路径：外部系统转换出来的 "YYYY-MM-DD" 字符串，由 serializer 再解析
+    dob: Union[date, str]
 
-@dataclass
+@dataclass(slots=True)
 class InternalProvider:
     name: str
     npi: str
 
-@dataclass
+@dataclass(slots=True)
 class InternalOrder:
     patient: InternalPatient
     provider: InternalProvider
@@ -31,7 +34,25 @@ class InternalOrder:
     
     def to_dict(self) -> dict:
         """转成 serializer 期望的嵌套 dict 格式"""
-        return asdict(self)
+        # 手写字段，不用 asdict()（它会递归 deepcopy 每个字段）
+        return {
+            "patient": {
+                "first_name": self.patient.first_name,
+                "last_name": self.patient.last_name,
+                "mrn": self.patient.mrn,
+                "dob": self.patient.dob,
+            },
+            "provider": {
+                "name": self.provider.name,
+                "npi": self.provider.npi,
+            },
+            "medication_name": self.medication_name,
+            "primary_diagnosis": self.primary_diagnosis,
+            "additional_diagnoses": list(self.additional_diagnoses),
+            "medication_history": list(self.medication_history),
+            "patient_records": self.patient_records,
+            "confirm": self.confirm,
+        }
     
     def to_serializer_format(self) -> dict:
         """拍平成 serializer 期望的格式（给验证用）"""
@@ -54,7 +75,11 @@ class InternalOrder:
 
 class AdapterError(Exception):
     """adapter 阶段的错误，区别于业务层的 BlockError/WarningException"""
-    pass
+
+    def __init__(self, message, field=None):
+        super().__init__(message)
+        # 哪个字段出的问题（validate 阶段才有，比如 "patient.mrn"）；parse 阶段的格式错误是 None
+        self.field = field
 
 
 class BaseIntakeAdapter(ABC):
@@ -89,19 +114,23 @@ class BaseIntakeAdapter(ABC):
         这只检查 adapter 转换有没有漏字段
         """
         if not order.patient.first_name:
-            raise AdapterError("patient.first_name is missing after transform")
+            raise AdapterError("patient.first_name is missing after transform", field="patient.first_name")
+        if not order.patient.last_name:
+            raise AdapterError("patient.last_name is missing after transform", field="patient.last_name")
         if not order.patient.mrn:
-            raise AdapterError("patient.mrn is missing after transform")
+            raise AdapterError("patient.mrn is missing after transform", field="patient.mrn")
         if not order.provider.npi:
-            raise AdapterError("provider.npi is missing after transform")
+            raise AdapterError("provider.npi is missing after transform", field="provider.npi")
         if not order.medication_name:
-            raise AdapterError("medication_name is missing after transform")
+            raise AdapterError("medication_name is missing after transform", field="medication_name")
     
     def process(self, raw_data) -> InternalOrder:
         """模板方法：parse → transform → validate
         
         子类不要覆盖这个方法，只实现 parse 和 transform
         """
+        # 只存引用，不 deepcopy（XML 原文 / 嵌套 dict 拷一遍都不便宜）
+        # 约定：adapter 和调用方在 process() 之后都不再修改 raw_data
         self.raw_data = raw_data
         parsed = self.parse(raw_data)
         order = self.transform(parsed)
@@ -1,7 +1,15 @@
+import orjson
+
 from .base import BaseIntakeAdapter, InternalOrder, InternalPatient, InternalProvider, AdapterError
 
 class ClinicBAdapter(BaseIntakeAdapter):
     def parse(self,raw_data):
+        # webhook 传进来的是原始 body，用 orjson（C 实现）一步解码，不经过 DRF 的 json 解析
+        if isinstance(raw_data, (bytes, str)):
+            try:
+                raw_data = orjson.loads(raw_data)
+            except orjson.JSONDecodeError:
+                raise AdapterError("Clinic B source must be a valid Json dictionary.")
         if not isinstance(raw_data,dict):
             raise AdapterError("Clinic B source must be a valid Json dictionary.")
         return raw_data
@@ -1,11 +1,20 @@
 # adapters/cvs_web.py
-from .base import BaseIntakeAdapter, InternalOrder, InternalPatient, InternalProvider
+import orjson
+
+from .base import BaseIntakeAdapter, InternalOrder, InternalPatient, InternalProvider, AdapterError
 
 class CvsWebAdapter(BaseIntakeAdapter):
     """CVS 内部 web form — 数据格式已经是标准格式"""
     
     def parse(self, raw_data):
-        # DRF 已经把 JSON 解析成 dict 了
+        # webhook 传原始 body（bytes）时用 orjson 解码；直接传 dict 的调用方照旧
+        if isinstance(raw_data, (bytes, str)):
+            try:
+                raw_data = orjson.loads(raw_data)
+            except orjson.JSONDecodeError:
+                raise AdapterError("CVS web source must be a valid Json dictionary.")
+        if not isinstance(raw_data, dict):
+            raise AdapterError("CVS web source must be a valid Json dictionary.")
         return raw_data
     
     def transform(self, parsed_data: dict) -> InternalOrder:
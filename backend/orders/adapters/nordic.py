@@ -1,5 +1,74 @@
 from .base import BaseIntakeAdapter, InternalOrder, InternalPatient, InternalProvider, AdapterError
 
+# 1985/12/31 → 1985-12-31：转换表只建一次，translate 是一个 C 循环
+_SLASH_TO_DASH = str.maketrans('/', '-')
+
+# 每种记录在类型标签后面要取几个字段
+_RECORD_FIELDS = {'PATIENT': 4, 'DOCTOR': 2, 'ORDER': 4}
+
+
+def _take_fields(line, start, count):
+    """
+    从 start 开始用 find 逐个定位竖线，只切出需要的 count 个字段
+    字段不够返回 None；多出来的尾巴不切（split 会把整行都切成小字符串）
+    """
+    fields = []
+    for _ in range(count - 1):
+        end = line.find('|', start)
+        if end == -1:
+            return None
+        fields.append(line[start:end])
+        start = end + 1
+    end = line.find('|', start)
+    fields.append(line[start:] if end == -1 else line[start:end])
+    return fields
+
+
+def _parse_nordic(text: str) -> dict:
+    """一遍扫完所有行，按记录类型把字段放进对应的 dict"""
+    # 分门别类准备好几个空字典来装切碎的字段
+    patient_data = {}
+    provider_data = {}
+    order_data = {'additional_diagnoses': []}
+
+    for line in text.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+
+        # 竖线前面是记录类型（PATIENT / DOCTOR / ORDER）
+        head = line.find('|')
+        if head == -1:
+            continue
+        prefix = line[:head]
+        count = _RECORD_FIELDS.get(prefix)
+        if count is None:
+            continue
+        fields = _take_fields(line, head + 1, count)
+        if fields is None:
+            continue
+
+        if prefix == "PATIENT":
+            patient_data['first_name'], patient_data['last_name'], patient_data['mrn'], dob = fields
+            # 把他们的 1985/12/31 变成标准的 1985-12-31
+            patient_data['dob'] = dob.translate(_SLASH_TO_DASH)
+
+        elif prefix == "DOCTOR":
+            provider_data['name'], provider_data['npi'] = fields
+
+        else:
+            order_data['medication_name'], order_data['primary_diagnosis'], raw_add_diags, status = fields
+
+            # 把副诊断 M12.0;M15.3 用分号切成列表
+            if raw_add_diags:
+                order_data['additional_diagnoses'] = [diag.strip() for diag in raw_add_diags.split(';')]
+
+            # 判断是不是大写的 CONFIRMED
+            order_data['confirm'] = (status.strip().upper() == "CONFIRMED")
+
+    return {'patient': patient_data, 'provider': provider_data, 'order': order_data}
+
+
 class NordicHealthAdapter(BaseIntakeAdapter):
     """
     接收纯文本格式的订单
@@ -16,46 +85,12 @@ class NordicHealthAdapter(BaseIntakeAdapter):
         if not isinstance(raw_data, str):
             raise AdapterError("Nordic Health data must be a string.")
             
-        # 按换行符切开，去掉多余的空行
-        lines = [line.strip() for line in raw_data.split('\n') if line.strip()]
-        return lines
-
-    def transform(self, parsed_lines: list) -> InternalOrder:
-        # 分门别类准备好几个空字典来装切碎的字段
-        patient_data = {}
-        provider_data = {}
-        order_data = {'additional_diagnoses': []}
-        
-        # 逐行扫描，按竖线切开
-        for line in parsed_lines:
-            parts = line.split('|')
-            if not parts:
-                continue
-                
-            prefix = parts[0]
-            
-            if prefix == "PATIENT" and len(parts) >= 5:
-                patient_data['first_name'] = parts[1]
-                patient_data['last_name'] = parts[2]
-                patient_data['mrn'] = parts[3]
-                # 把他们的 1985/12/31 变成标准的 1985-12-31
-                patient_data['dob'] = parts[4].replace('/', '-')
-                
-            elif prefix == "DOCTOR" and len(parts) >= 3:
-                provider_data['name'] = parts[1]
-                provider_data['npi'] = parts[2]
-                
-            elif prefix == "ORDER" and len(parts) >= 5:
-                order_data['medication_name'] = parts[1]
-                order_data['primary_diagnosis'] = parts[2]
-                
-                # 把副诊断 M12.0;M15.3 用分号切成列表
-                raw_add_diags = parts[3]
-                if raw_add_diags:
-                    order_data['additional_diagnoses'] = [diag.strip() for diag in raw_add_diags.split(';')]
-                
-                # 判断是不是大写的 CONFIRMED
-                order_data['confirm'] = (parts[4].strip().upper() == "CONFIRMED")
+        return _parse_nordic(raw_data)
+
+    def transform(self, parsed_data: dict) -> InternalOrder:
+        patient_data = parsed_data['patient']
+        provider_data = parsed_data['provider']
+        order_data = parsed_data['order']
 
         # 组装神圣的公文包！
         return InternalOrder(
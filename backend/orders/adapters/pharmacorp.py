@@ -2,53 +2,96 @@ import xml.etree.ElementTree as ET
 from xml.etree.ElementTree import ParseError
 from .base import BaseIntakeAdapter, InternalOrder, InternalPatient, InternalProvider, AdapterError
 
+
+# (父节点, 节点) → 要的字段名；只有这几个节点的文字会被留下来
+_FIELDS = {
+    ('Patient', 'GivenName'): 'first_name',
+    ('Patient', 'SurName'): 'last_name',
+    ('Patient', 'MedRecordNum'): 'mrn',
+    ('Patient', 'DateOfBirth'): 'dob',
+    ('Prescriber', 'FullName'): 'provider_name',
+    ('Prescriber', 'NationalProviderId'): 'provider_npi',
+    ('ClinicalInfo', 'DrugName'): 'medication_name',
+    ('ClinicalInfo', 'PrimaryDiagCode'): 'primary_diagnosis',
+}
+
+
+class _PharmaCorpTarget:
+    """
+    XMLParser 的 target：expat（C）一边解析一边回调这里，不建整棵树
+    只记录关心的节点文字，最后 close() 直接返回字段 dict
+    """
+
+    def __init__(self):
+        self.tags = []           # 当前路径上的节点名
+        self.text = []
+        self.fields = {}
+        self.codes = []
+
+    def start(self, tag, attrib):
+        self.tags.append(tag)
+        self.text.clear()
+
+    def data(self, data):
+        self.text.append(data)
+
+    def end(self, tag):
+        self.tags.pop()
+        parent = self.tags[-1] if self.tags else None
+        if tag == 'Code' and parent == 'OtherDiagCodes':
+            code = ''.join(self.text)
+            if code:
+                self.codes.append(code)
+        else:
+            name = _FIELDS.get((parent, tag))
+            # 和 findtext 一样：同名节点取第一个
+            if name and name not in self.fields:
+                self.fields[name] = ''.join(self.text)
+        self.text.clear()
+
+    def close(self):
+        self.fields['additional_diagnoses'] = self.codes
+        return self.fields
+
+
 class PharmaCorpAdapter(BaseIntakeAdapter):
-    
+
     def parse(self, raw_data):
         # 1. 解包挑战：这回传进来的是二进制字符串或纯文本字符串
+        # bytes 直接交给 expat，它会按 XML 声明里的编码自己解码
         try:
-            # 万一接收到的是 django 传来的 bytes，我们要先解码成字符串
-            if isinstance(raw_data, bytes):
-                raw_data = raw_data.decode('utf-8')
-                
-            # 使用 ElementTree 这个 Python 自带的神器把 XML 变成“树”
-            root = ET.fromstring(raw_data)
-            return root
-            
+            parser = ET.XMLParser(target=_PharmaCorpTarget())
+            parser.feed(raw_data)
+            return parser.close()
+
         except ParseError as e:
             raise AdapterError(f"PharmaCorp data must be valid XML. Error: {str(e)}")
 
     def transform(self, parsed_data) -> InternalOrder:
-        # 2. 这里的 parsed_data 是一棵 XML 树的根节点 (root) 了！
-        # 我们可以用 .findtext('路径') 来优雅地提取文字
-        
-        # 难点 A：获取所有的副诊断代码 <Code>，并变成列表
-        # .findall 找出来的是一群 XML 节点对象，我们需要用 for 循环把每个节点的 .text 取出来
-        nodes = parsed_data.findall('.//OtherDiagCodes/Code')
-        additional_diags = [node.text for node in nodes if node.text]
-        
+        # 2. 这里的 parsed_data 是 target 收集好的字段 dict，副诊断已经是列表了
+
         # 难点 B：把他们奇葩的美国生日格式 "11-20-1990" 变成标准的 "1990-11-20"
-        raw_dob = parsed_data.findtext('.//Patient/DateOfBirth', '')
+        raw_dob = parsed_data.get('dob', '')
         standard_dob = ""
         if raw_dob and len(raw_dob) == 10:
             # 切片拼接：取后四位年，加上前两位月，加上中间两位日
             standard_dob = f"{raw_dob[6:10]}-{raw_dob[0:2]}-{raw_dob[3:5]}"
-        
+
         # 难点 C：组装终极公文包
         return InternalOrder(
             patient=InternalPatient(
-                first_name=parsed_data.findtext('.//Patient/GivenName', ''),
-                last_name=parsed_data.findtext('.//Patient/SurName', ''),
-                mrn=parsed_data.findtext('.//Patient/MedRecordNum', ''),
-                dob=standard_dob  
+                first_name=parsed_data.get('first_name', ''),
+                last_name=parsed_data.get('last_name', ''),
+                mrn=parsed_data.get('mrn', ''),
+                dob=standard_dob
             ),
             provider=InternalProvider(
-                name=parsed_data.findtext('.//Prescriber/FullName', ''),
-                npi=parsed_data.findtext('.//Prescriber/NationalProviderId', '')
+                name=parsed_data.get('provider_name', ''),
+                npi=parsed_data.get('provider_npi', '')
             ),
-            medication_name=parsed_data.findtext('.//ClinicalInfo/DrugName', ''),
-            primary_diagnosis=parsed_data.findtext('.//ClinicalInfo/PrimaryDiagCode', ''),
-            additional_diagnoses=additional_diags, 
+            medication_name=parsed_data.get('medication_name', ''),
+            primary_diagnosis=parsed_data.get('primary_diagnosis', ''),
+            additional_diagnoses=parsed_data['additional_diagnoses'],
             medication_history=[], # XML 里没这玩意，直接空列表
             patient_records="",
             confirm=False # 如果外网没传确认状态，默认算 False
@@ -2,20 +2,68 @@
 #
 # Django Management Command：自定义的命令行工具
 # 运行方式：python manage.py load_mock_data
+#          python manage.py load_mock_data --size 50000   （批量造数据，压测 / 测试环境用）
 #
 # 这个脚本会往 4 张表里插入测试数据
 # 注意看：同一个 Patient 被多个 Order 引用，不再重复存储了！
+#
+# --size N 的三种模式：
+#   N <= 10          → 下面手写的那 8 个订单（开发时看得懂）
+#   10 < N <= 1000   → 生成 N 个订单，bulk_create
+#   N > 1000         → 生成 N 个订单，Postgres COPY ... FROM STDIN
+#                      （跳过 SQL 解析和逐行往返，比 bulk_create 快一个数量级以上）
+
+import io
+from datetime import date, timedelta
 
 from django.core.management.base import BaseCommand
+from django.core.management.color import no_style
+from django.db import connection, transaction
 from django.utils import timezone
 from orders.models import Patient, Provider, Order, CarePlan
-from datetime import date
+
+SMALL_SIZE = 10
+COPY_THRESHOLD = 1000
+
+# 批量造数据用的素材，按下标轮换
+FIRST_NAMES = ['Jane', 'John', 'Maria', 'James', 'Emily', 'Wei', 'Aisha', 'Carlos']
+LAST_NAMES = ['Doe', 'Smith', 'Garcia', 'Wilson', 'Chen', 'Zhang', 'Khan', 'Lopez']
+PROVIDER_NAMES = ['Dr. Sarah Johnson', 'Dr. Michael Lee', 'Dr. Rachel Kim', 'Dr. Omar Haddad']
+MEDICATIONS = [
+    ('IVIG', 'G70.01'), ('Rituximab', 'G70.01'), ('Humira', 'K50.90'),
+    ('Stelara', 'K50.90'), ('Ocrevus', 'G35'), ('Keytruda', 'C34.90'),
+    ('Dupixent', 'L20.9'),
+]
+ADDITIONAL_DIAGNOSES = [[], ['I10'], ['K21.0'], ['I10', 'E11.9'], ['J45.20']]
+STATUSES = ['completed', 'completed', 'pending', 'processing', 'failed']
+GENERATED_CARE_PLAN = """1. Problem List / Drug Therapy Problems (DTPs)
+- Generated mock care plan for load testing
+
+2. Goals (SMART format)
+- N/A
+
+3. Pharmacist Interventions / Plan
+- N/A
+
+4. Monitoring Plan & Lab Schedule
+- N/A"""
 
 
 class Command(BaseCommand):
     help = 'Load mock data into Patient, Provider, Order, and CarePlan tables'
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--size', type=int, default=None,
+            help=f'生成 N 个订单；N<={SMALL_SIZE} 用手写数据，N>{COPY_THRESHOLD} 走 COPY',
+        )
+
     def handle(self, *args, **options):
+        size = options['size']
+        if size is not None and size > SMALL_SIZE:
+            self._load_generated(size)
+            return
+
         # 先清空旧数据（方便你反复运行这个脚本测试）
         self.stdout.write('Clearing existing data...')
         CarePlan.objects.all().delete()
@@ -305,17 +353,18 @@ class Command(BaseCommand):
         # ============================================================
         # 打印总结
         # ============================================================
+        n_patients, n_providers, n_orders, n_care_plans, n_jane_orders = _summary_counts(patients[0].pk)
         self.stdout.write(self.style.SUCCESS(f"""
 ✅ Mock data loaded successfully!
 
 Summary:
-  Patients:   {Patient.objects.count()}
-  Providers:  {Provider.objects.count()}
-  Orders:     {Order.objects.count()}
-  CarePlans:  {CarePlan.objects.count()}
+  Patients:   {n_patients}
+  Providers:  {n_providers}
+  Orders:     {n_orders}
+  CarePlans:  {n_care_plans}
 
 Key point to observe:
-  Jane Doe (MRN: 123456) has {patients[0].orders.count()} orders
+  Jane Doe (MRN: 123456) has {n_jane_orders} orders
   → but Patient table only has 1 record for her!
   → This is normalization in action 🎉
 
@@ -326,3 +375,152 @@ Try these queries:
   >>> Order.objects.filter(status='completed').count()
   >>> Order.objects.get(id=1).care_plan.content[:100]
 """))
+
+    # ============================================================
+    # 批量造数据（--size N，N > 10）
+    # ============================================================
+    def _generated_rows(self, size):
+        """
+        按 size 生成 (patients, providers, orders, care_plans) 四组元组
+        id 直接指定（1..N），这样 Order 的外键不用回查数据库
+        """
+        now = timezone.now()
+        n_patients = max(1, size // 2)          # 平均每个患者 2 个订单
+        n_providers = max(1, size // 50)
+
+        patients = [
+            (i, FIRST_NAMES[i % len(FIRST_NAMES)], LAST_NAMES[(i // len(FIRST_NAMES)) % len(LAST_NAMES)],
+             f'{i:06d}', date(1950, 1, 1) + timedelta(days=i % 20000), now)
+            for i in range(1, n_patients + 1)
+        ]
+        providers = [
+            (i, PROVIDER_NAMES[i % len(PROVIDER_NAMES)], f'{i:010d}', now)
+            for i in range(1, n_providers + 1)
+        ]
+        orders = []
+        care_plans = []
+        for i in range(1, size + 1):
+            medication_name, primary_diagnosis = MEDICATIONS[i % len(MEDICATIONS)]
+            status = STATUSES[i % len(STATUSES)]
+            orders.append((
+                i, (i - 1) % n_patients + 1, (i - 1) % n_providers + 1,
+                medication_name, primary_diagnosis,
+                ADDITIONAL_DIAGNOSES[i % len(ADDITIONAL_DIAGNOSES)],
+                [m for m, _ in MEDICATIONS[:i % 3]],
+                f'Generated mock order #{i}.',
+                status, now.date(), now,
+            ))
+            if status == 'completed':
+                care_plans.append((i, i, GENERATED_CARE_PLAN, now))
+        return patients, providers, orders, care_plans
+
+    def _load_generated(self, size):
+        patients, providers, orders, care_plans = self._generated_rows(size)
+        use_copy = size > COPY_THRESHOLD and connection.vendor == 'postgresql'
+        self.stdout.write(
+            f"Generating {size} orders via {'COPY' if use_copy else 'bulk_create'}..."
+        )
+
+        with transaction.atomic():
+            if use_copy:
+                self._copy_load(patients, providers, orders, care_plans)
+            else:
+                self._bulk_create_load(patients, providers, orders, care_plans)
+
+            # id 是手动指定的，自增序列要跟上，否则之后正常下单会主键冲突
+            with connection.cursor() as cursor:
+                for sql in connection.ops.sequence_reset_sql(
+                    no_style(), [Patient, Provider, Order, CarePlan]
+                ):
+                    cursor.execute(sql)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Loaded {len(patients)} patients, {len(providers)} providers, "
+            f"{len(orders)} orders, {len(care_plans)} care plans"
+        ))
+
+    def _bulk_create_load(self, patients, providers, orders, care_plans):
+        CarePlan.objects.all().delete()
+        Order.objects.all().delete()
+        Patient.objects.all().delete()
+        Provider.objects.all().delete()
+
+        Patient.objects.bulk_create(
+            Patient(id=i, first_name=fn, last_name=ln, mrn=mrn, dob=dob)
+            for i, fn, ln, mrn, dob, _ in patients
+        )
+        Provider.objects.bulk_create(
+            Provider(id=i, name=name, npi=npi) for i, name, npi, _ in providers
+        )
+        Order.objects.bulk_create(
+            Order(
+                id=i, patient_id=patient_id, provider_id=provider_id,
+                medication_name=med, primary_diagnosis=dx,
+                additional_diagnoses=addl, medication_history=history,
+                patient_records=records, status=status,
+            )
+            for i, patient_id, provider_id, med, dx, addl, history, records, status, _, _ in orders
+        )
+        CarePlan.objects.bulk_create(
+            CarePlan(id=i, order_id=order_id, content=content)
+            for i, order_id, content, _ in care_plans
+        )
+
+    def _copy_load(self, patients, providers, orders, care_plans):
+        tables = [
+            (CarePlan._meta.db_table, ('id', 'order_id', 'content', 'created_at'), care_plans),
+            (Order._meta.db_table, (
+                'id', 'patient_id', 'provider_id', 'medication_name', 'primary_diagnosis',
+                'additional_diagnoses', 'medication_history', 'patient_records',
+                'status', 'order_date', 'created_at',
+            ), orders),
+            (Patient._meta.db_table, ('id', 'first_name', 'last_name', 'mrn', 'dob', 'created_at'), patients),
+            (Provider._meta.db_table, ('id', 'name', 'npi', 'created_at'), providers),
+        ]
+        with connection.cursor() as cursor:
+            cursor.execute('TRUNCATE {} CASCADE'.format(', '.join(t for t, _, _ in tables)))
+            # 先父表后子表
+            for table, columns, rows in reversed(tables):
+                cursor.copy_expert(
+                    f"COPY {table} ({', '.join(columns)}) FROM STDIN",
+                    io.StringIO(''.join(_copy_line(row) for row in rows)),
+                )
+
+
+# ============================================================
+# 总结里的计数：5 个 COUNT 合成一条 SQL（标量子查询），一次往返
+# ============================================================
+def _summary_counts(patient_id):
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            SELECT
+                (SELECT COUNT(*) FROM {Patient._meta.db_table}),
+                (SELECT COUNT(*) FROM {Provider._meta.db_table}),
+                (SELECT COUNT(*) FROM {Order._meta.db_table}),
+                (SELECT COUNT(*) FROM {CarePlan._meta.db_table}),
+                (SELECT COUNT(*) FROM {Order._meta.db_table} WHERE patient_id = %s)
+            """,
+            [patient_id],
+        )
+        return cursor.fetchone()
+
+
+# ============================================================
+# COPY text 格式编码
+# ============================================================
+_COPY_ESCAPES = str.maketrans({'\\': '\\\\', '\t': '\\t', '\n': '\\n', '\r': '\\r'})
+
+
+def _copy_value(value):
+    if isinstance(value, list):
+        # Postgres 数组字面量：{"I10","K21.0"}
+        items = ('"' + v.replace('\\', '\\\\').replace('"', '\\"') + '"' for v in value)
+        value = '{' + ','.join(items) + '}'
+    elif hasattr(value, 'isoformat'):
+        value = value.isoformat()
+    return str(value).translate(_COPY_ESCAPES)
+
+
+def _copy_line(row):
+    return '\t'.join(_copy_value(v) for v in row) + '\n'
@@ -0,0 +1,71 @@
+# additional_diagnoses / medication_history：JSONField → Postgres ArrayField + GIN 索引
+#
+# jsonb 不能直接 ALTER 成 varchar[]，所以分四步：
+# 1. 加新的数组列  2. 把旧 JSON 数据搬过去  3. 删旧列  4. 新列改回原名
+
+import django.contrib.postgres.fields
+import django.contrib.postgres.indexes
+from django.db import migrations, models
+
+
+def copy_json_to_array(apps, schema_editor):
+    Order = apps.get_model('orders', 'Order')
+    for order in Order.objects.only('id', 'additional_diagnoses', 'medication_history').iterator():
+        order.additional_diagnoses_arr = [str(x) for x in (order.additional_diagnoses or [])]
+        order.medication_history_arr = [str(x) for x in (order.medication_history or [])]
+        order.save(update_fields=['additional_diagnoses_arr', 'medication_history_arr'])
+
+
+def copy_array_to_json(apps, schema_editor):
+    Order = apps.get_model('orders', 'Order')
+    for order in Order.objects.only('id', 'additional_diagnoses_arr', 'medication_history_arr').iterator():
+        order.additional_diagnoses = list(order.additional_diagnoses_arr)
+        order.medication_history = list(order.medication_history_arr)
+        order.save(update_fields=['additional_diagnoses', 'medication_history'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='additional_diagnoses_arr',
+            field=django.contrib.postgres.fields.ArrayField(base_field=models.CharField(max_length=32), blank=True, default=list, size=None),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='medication_history_arr',
+            field=django.contrib.postgres.fields.ArrayField(base_field=models.CharField(max_length=200), blank=True, default=list, size=None),
+        ),
+        migrations.RunPython(copy_json_to_array, copy_array_to_json),
+        migrations.RemoveField(
+            model_name='order',
+            name='additional_diagnoses',
+        ),
+        migrations.RemoveField(
+            model_name='order',
+            name='medication_history',
+        ),
+        migrations.RenameField(
+            model_name='order',
+            old_name='additional_diagnoses_arr',
+            new_name='additional_diagnoses',
+        ),
+        migrations.RenameField(
+            model_name='order',
+            old_name='medication_history_arr',
+            new_name='medication_history',
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['additional_diagnoses'], name='order_addl_dx_gin'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['medication_history'], name='order_med_history_gin'),
+        ),
+    ]
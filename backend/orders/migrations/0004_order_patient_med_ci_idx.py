@@ -0,0 +1,16 @@
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0003_order_ordering_brin'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(models.F('patient'), django.db.models.functions.text.Lower('medication_name'), name='order_patient_med_ci_idx'),
+        ),
+    ]
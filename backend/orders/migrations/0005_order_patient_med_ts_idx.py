@@ -0,0 +1,20 @@
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0004_order_patient_med_ci_idx'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='order',
+            name='order_patient_med_ci_idx',
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(models.F('patient'), django.db.models.functions.text.Lower('medication_name'), models.F('created_at'), name='ord_pat_med_ts_idx'),
+        ),
+    ]
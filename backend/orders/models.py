@@ -7,7 +7,19 @@
 # Day 2 里同一个患者下 3 个订单 → 患者信息存了 3 遍（浪费+不一致风险）
 # 现在 Patient 表只存 1 条 → 3 个 Order 通过外键指向它
 
+from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import BrinIndex, GinIndex, OpClass
 from django.db import models
+from django.db.models import F
+from django.db.models.functions import Lower, Upper
+
+
+def trigram_index(field, name):
+    """
+    给 __icontains 搜索用的 pg_trgm GIN 索引
+    icontains 生成的是 UPPER(col) LIKE UPPER('%x%')，索引表达式也得是 UPPER(col) 才用得上
+    """
+    return GinIndex(OpClass(Upper(field), name='gin_trgm_ops'), name=name)
 
 
 class Patient(models.Model):
@@ -23,6 +35,16 @@ class Patient(models.Model):
     dob = models.DateField()                             # Date of Birth
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # check_patient 的 "名字 + DOB 相同" 分支（MRN 那一支走 unique 索引），两支 OR 起来可以 BitmapOr
+            models.Index(fields=['last_name', 'first_name', 'dob'], name='patient_name_dob_idx'),
+            # 订单列表的 ?search= 按姓名 / MRN 做子串匹配
+            trigram_index('first_name', 'patient_first_name_trgm'),
+            trigram_index('last_name', 'patient_last_name_trgm'),
+            trigram_index('mrn', 'patient_mrn_trgm'),
+        ]
+
     def __str__(self):
         return f"{self.last_name}, {self.first_name} (MRN: {self.mrn})"
 
@@ -70,8 +92,10 @@ class Order(models.Model):
     # ---------- 药物 & 诊断 ----------
     medication_name = models.CharField(max_length=200)
     primary_diagnosis = models.CharField(max_length=20)    # ICD-10 code
-    additional_diagnoses = models.JSONField(default=list, blank=True)
-    medication_history = models.JSONField(default=list, blank=True)
+    # 原生 Postgres 数组（text[]）：读取不用再解析 JSONB，
+    # 配合 GIN 索引，additional_diagnoses__contains=['I10'] 这类查询直接走索引
+    additional_diagnoses = ArrayField(models.CharField(max_length=32), default=list, blank=True)
+    medication_history = ArrayField(models.CharField(max_length=200), default=list, blank=True)
     patient_records = models.TextField(blank=True, default='')
 
     # ---------- 订单元数据 ----------
@@ -79,6 +103,23 @@ class Order(models.Model):
     order_date = models.DateField(auto_now_add=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        ordering = ['-order_date']
+        indexes = [
+            GinIndex(fields=['additional_diagnoses'], name='order_addl_dx_gin'),
+            GinIndex(fields=['medication_history'], name='order_med_history_gin'),
+            # order_date 只增不改（auto_now_add），和物理存储顺序一致，
+            # BRIN 只记每个 block 范围的 min/max，几 KB 就能做时间范围裁剪
+            BrinIndex(fields=['order_date'], name='order_order_date_brin'),
+            # 重复下单检测：同患者 + 药名（不区分大小写）+ 创建时间，对应 check_order_duplicate 的查询
+            # created_at 放最后：当天的范围条件和 MAX(created_at) 都在索引里就能算
+            models.Index(F('patient'), Lower('medication_name'), F('created_at'), name='ord_pat_med_ts_idx'),
+            # 订单列表的 ?search= 按药名做子串匹配
+            trigram_index('medication_name', 'order_med_name_trgm'),
+            # 订单列表按 created_at 倒序分页：索引顺序扫描直接拿到前 50 条，不用全表排序
+            models.Index(fields=['-created_at'], name='order_created_at_desc_idx'),
+        ]
+
     def __str__(self):
         return f"Order #{self.id} - {self.patient} - {self.medication_name}"
 
@@ -1,6 +1,10 @@
 # backend/orders/serializers.py
+from django.db.models import CharField, F, Value
+from django.db.models.functions import Concat
 from rest_framework import serializers
 from .models import Order, Patient, Provider
+from .services import create_order
+from .adapters.base import InternalOrder, InternalPatient, InternalProvider
 
 class PatientInputSerializer(serializers.Serializer):
     first_name = serializers.CharField()
@@ -17,8 +21,9 @@ class OrderSerializer(serializers.ModelSerializer):
     patient = PatientInputSerializer(required=False)
     provider = ProviderInputSerializer(required=False)
 
-    # 动态获取关联的 CarePlan 内容 (只读)
-    care_plan_content = serializers.SerializerMethodField()
+    # 关联的 CarePlan 内容 (只读)：DRF 直接按 source 取属性，不走 Python 方法；
+    # 没有 CarePlan 时 RelatedObjectDoesNotExist 会被 DRF 吞掉，返回 default
+    care_plan_content = serializers.CharField(source='care_plan.content', read_only=True, default=None)
     # 增加 order_id 字段，匹配 Lambda 返回结果
     order_id = serializers.IntegerField(source='id', read_only=True)
 
@@ -28,24 +33,50 @@ class OrderSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Order
-        fields = '__all__'
+        # 不用 '__all__'：列表接口只返回这些列，大字段（patient_records、两个数组）
+        # 只写不读，详情接口再用 OrderDetailSerializer 返回
+        fields = (
+            'id', 'order_id', 'patient', 'provider', 'patient_name', 'provider_name_display',
+            'medication_name', 'primary_diagnosis',
+            'additional_diagnoses', 'medication_history', 'patient_records',
+            'status', 'order_date', 'created_at', 'care_plan_content',
+        )
         read_only_fields = ['id', 'status', 'order_date', 'created_at']
+        extra_kwargs = {
+            'additional_diagnoses': {'write_only': True},
+            'medication_history': {'write_only': True},
+            'patient_records': {'write_only': True},
+        }
 
-    def get_care_plan_content(self, obj):
-        if hasattr(obj, 'care_plan'):
-            return obj.care_plan.content
-        return None
+    @classmethod
+    def setup_eager_loading(cls, queryset):
+        """
+        patient / provider / care_plan 都会在序列化时访问，
+        一次 JOIN 取回来，避免列表每行再各查一次（N+1）
+        显示用的姓名直接在 SQL 里拼好，serializer 不用再逐行 f-string
+        """
+        return queryset.select_related('patient', 'provider', 'care_plan').annotate(
+            patient_full_name=Concat(
+                'patient__first_name', Value(' '), 'patient__last_name',
+                output_field=CharField(),
+            ),
+            provider_display_name=F('provider__name'),
+        )
 
     def get_patient_name(self, obj):
+        full_name = getattr(obj, 'patient_full_name', None)
+        if full_name is not None:
+            return full_name
+        # 刚创建的订单（POST 返回）没走 setup_eager_loading，没有注解
         return f"{obj.patient.first_name} {obj.patient.last_name}" if obj.patient else ""
 
     def get_provider_name_display(self, obj):
+        display_name = getattr(obj, 'provider_display_name', None)
+        if display_name is not None:
+            return display_name
         return obj.provider.name if obj.provider else ""
 
     def create(self, validated_data):
-        from .services import create_order
-        from .adapters.base import InternalOrder, InternalPatient, InternalProvider
-        
         confirm = self.context.get('confirm', False)
         
         # 处理嵌套数据
@@ -57,7 +88,7 @@ class OrderSerializer(serializers.ModelSerializer):
                 first_name=patient_data.get('first_name', ''),
                 last_name=patient_data.get('last_name', ''),
                 mrn=patient_data.get('mrn', ''),
-                dob=str(patient_data.get('dob', ''))
+                dob=patient_data.get('dob'),
             ),
             provider=InternalProvider(
                 name=provider_data.get('name', ''),
@@ -72,3 +103,27 @@ class OrderSerializer(serializers.ModelSerializer):
         )
         
         return create_order(internal_order)
+
+
+class OrderListSerializer(OrderSerializer):
+    """
+    列表接口专用：不返回 care plan 正文，只告诉前端有没有
+    配合 view 里的 defer('care_plan__content')，正文不会从数据库拉出来
+    """
+    care_plan_content = None
+    has_care_plan = serializers.SerializerMethodField()
+
+    class Meta(OrderSerializer.Meta):
+        fields = tuple(
+            f for f in OrderSerializer.Meta.fields if f != 'care_plan_content'
+        ) + ('has_care_plan',)
+
+    def get_has_care_plan(self, obj):
+        return hasattr(obj, 'care_plan')
+
+
+class OrderDetailSerializer(OrderSerializer):
+    """单个订单详情：在列表字段基础上把大字段也返回"""
+
+    class Meta(OrderSerializer.Meta):
+        extra_kwargs = {}
@@ -5,15 +5,25 @@
 所有"怎么做"的逻辑都在这里，views.py 只负责"接什么请求、返回什么响应"
 
 """
+import logging
+from datetime import timedelta
+
 from .adapters.base import InternalOrder
 from django.conf import settings
+from django.core.cache import cache
+
+from django.db import transaction
+from django.db.models import Case, Count, F, Max, Q, Value, When
+from django.db.models.functions import Lower
 
 from .models import Order, CarePlan, Patient, Provider
-from .tasks import generate_care_plan_task
+from .tasks import enqueue_care_plan
 from django.utils import timezone
 from .exceptions import BlockError, WarningException
 from .LLMServices import get_LLM_adapter
 
+logger = logging.getLogger(__name__)
+
 
 # ============================================================
 # LLM 调用
@@ -26,13 +36,19 @@ class CarePlanService:
         content = self.llm.generate_care_plan(order)
         return content
 
+
+# ============================================================
+# 重复检测
+# ============================================================
+# 这三个函数只在 create_order 的事务里调用：查到的行用 select_for_update 锁住，
+# 检测和插入之间不会被并发请求插队
 def check_provider(provider_data):
     """Provider 重复检测"""
     npi = provider_data['npi']
     name = provider_data['name']
     
     try:
-        existing = Provider.objects.get(npi=npi)
+        existing = Provider.objects.select_for_update().get(npi=npi)
     except Provider.DoesNotExist:
         return None  # 全新 NPI，没问题
     
@@ -53,32 +69,31 @@ def check_patient(patient_data, confirm=False):
     dob = patient_data['dob']
     
     warnings = []
-    
+
+    # 一次查询拿到两类候选：MRN 相同的（最多 1 条，MRN unique）+ 名字+DOB 相同的
+    # 排序保证 MRN 匹配排第一，LIMIT 2 足够覆盖两种情况
+    matches = list(
+        Patient.objects.select_for_update()
+        .filter(Q(mrn=mrn) | Q(first_name=first_name, last_name=last_name, dob=dob))
+        .order_by(Case(When(mrn=mrn, then=Value(0)), default=Value(1)), 'id')[:2]
+    )
+    existing = next((p for p in matches if p.mrn == mrn), None)
+    match = next((p for p in matches if p.mrn != mrn), None)
+
     # 检查 1: MRN 已存在
-    try:
-        existing = Patient.objects.get(mrn=mrn)
-        if (existing.first_name == first_name 
-            and existing.last_name == last_name 
+    if existing is not None:
+        if (existing.first_name == first_name
+            and existing.last_name == last_name
             and str(existing.dob) == str(dob)):
             return existing
-        else:
-            warnings.append(
-                f"MRN {mrn} exists for '{existing.first_name} {existing.last_name}' "
-                f"(DOB: {existing.dob}), but you submitted "
-                f"'{first_name} {last_name}' (DOB: {dob})."
-            )
-    except Patient.DoesNotExist:
-        pass
-    
+        warnings.append(
+            f"MRN {mrn} exists for '{existing.first_name} {existing.last_name}' "
+            f"(DOB: {existing.dob}), but you submitted "
+            f"'{first_name} {last_name}' (DOB: {dob})."
+        )
+
     # 检查 2: 名字+DOB 相同但 MRN 不同
-    same_name_dob = Patient.objects.filter(
-        first_name=first_name,
-        last_name=last_name,
-        dob=dob
-    ).exclude(mrn=mrn)
-    
-    if same_name_dob.exists():
-        match = same_name_dob.first()
+    if match is not None:
         warnings.append(
             f"Patient '{first_name} {last_name}' (DOB: {dob}) already exists "
             f"with MRN {match.mrn}, but you submitted MRN {mrn}."
@@ -96,18 +111,27 @@ def check_patient(patient_data, confirm=False):
 
 def check_order_duplicate(patient, medication_name, confirm=False):
     """Order 重复检测"""
-    today = timezone.now().date()
-    
-    existing = Order.objects.filter(
-        patient=patient,
-        medication_name__iexact=medication_name
+    # 今天 = [当天 00:00, 明天 00:00)；不用 created_at__date（CAST 成 DATE 后用不上索引）
+    today_start = timezone.localtime().replace(hour=0, minute=0, second=0, microsecond=0)
+    tomorrow_start = today_start + timedelta(days=1)
+
+    # 一次聚合：今天有几单 + 最近一单的时间（没有订单时 latest 是 None）
+    # 不用 __iexact（UPPER(col::text) 用不上索引），两边都 LOWER()，
+    # 正好命中 (patient_id, LOWER(medication_name), created_at) 函数索引
+    stats = Order.objects.filter(patient=patient).annotate(
+        medication_key=Lower('medication_name')
+    ).filter(
+        medication_key=Lower(Value(medication_name))
+    ).aggregate(
+        today_count=Count('id', filter=Q(created_at__gte=today_start, created_at__lt=tomorrow_start)),
+        latest=Max('created_at'),
     )
-    
-    if not existing.exists():
+
+    if stats['latest'] is None:
         return None
     
     # 同患者 + 同药 + 同一天 → ERROR（不可跳过）
-    if existing.filter(created_at__date=today).exists():
+    if stats['today_count']:
         raise BlockError(                           # ← 改：raise
             message="Duplicate order",
             detail=f"Patient {patient.first_name} {patient.last_name} "
@@ -117,13 +141,12 @@ def check_order_duplicate(patient, medication_name, confirm=False):
         )
     
     # 同患者 + 同药 + 不同天 → WARNING
-    latest = existing.order_by('-created_at').first()
     if not confirm:
         raise WarningException(                     # ← 改：raise
             message="Previous order exists",
             detail=f"Patient {patient.first_name} {patient.last_name} "
                    f"(MRN: {patient.mrn}) had a previous order for "
-                   f"'{medication_name}' on {latest.created_at.date()}.",
+                   f"'{medication_name}' on {stats['latest'].date()}.",
             code="ORDER_PREVIOUS_EXISTS"
         )
     
@@ -131,6 +154,7 @@ def check_order_duplicate(patient, medication_name, confirm=False):
 # ============================================================
 # 创建订单
 # ============================================================
+@transaction.atomic
 def create_order(internal_order: InternalOrder):
     patient_data = {
         'first_name': internal_order.patient.first_name,
@@ -166,34 +190,118 @@ def create_order(internal_order: InternalOrder):
     )
     return order 
   
-def submit_care_plan_task(order_id):
-    """触发 Celery 异步任务生成 care plan"""
-    generate_care_plan_task.delay(order_id)
+# 按"预计输出长度"分箱：一个 batch 要等最慢的那个生成完，
+# 长短混在一起，短的会被长的拖住（head-of-line blocking）
+LONG_RECORDS_CHARS = 500
+LONG_DIAGNOSES_COUNT = 3
+
+
+def care_plan_length_bin(patient_records, additional_diagnoses):
+    """病历短、合并诊断少 → short；否则 long"""
+    if (len(patient_records or '') < LONG_RECORDS_CHARS
+            and len(additional_diagnoses or []) < LONG_DIAGNOSES_COUNT):
+        return 'short'
+    return 'long'
+
+
+def submit_care_plan_task(order):
+    """
+    触发 Celery 异步任务生成 care plan
+    先按预计长度分箱，再进对应的 Redis 列表攒批，由对应队列（careplan_short / careplan_long）的 worker 处理
+    order 是刚保存的那个实例，分箱直接用它身上的字段，不再查库
+    进队列放在 on_commit 里：外层还有事务时，等订单真正提交了 worker 才能拿到 id，
+    不会出现 worker 先 LPOP 到、却还查不到这行的情况；没有外层事务就立刻执行
+    """
+    order_id = order.pk
+    length_bin = care_plan_length_bin(order.patient_records, order.additional_diagnoses)
+    transaction.on_commit(lambda: enqueue_care_plan(order_id, length_bin))
 
 
 # ============================================================
 # 查询订单状态
 # ============================================================
+def _order_with_care_plan(*related):
+    """
+    Order + 关联表一次 JOIN 取回（下载文件要用到完整的患者 / 医生信息），
+    care plan 正文用 LEFT JOIN 注解成 care_plan_content
+    没有 CarePlan 时是 None，不用再 hasattr(order, 'care_plan')（会多查一次还要吞异常）
+    """
+    return Order.objects.select_related(*related).annotate(care_plan_content=F('care_plan__content'))
+
+
+# ============================================================
+# 状态 / 详情的响应缓存（cache-aside）
+# ============================================================
+# 前端会一直轮询状态接口。completed 且 care plan 已经在库里之后内容不会再变，缓存一天；
+# 其他情况（pending / processing、completed 但还读不到 care plan、错误结果）只缓存 1 秒，挡住同一时刻的重复轮询
+ORDER_STATUS_CACHE_KEY = 'order:status:{}'
+CARE_PLAN_DETAIL_CACHE_KEY = 'order:careplan:{}'
+CARE_PLAN_FILE_CACHE_KEY = 'order:careplan:file:{}'
+COMPLETED_CACHE_TIMEOUT = 86400
+IN_PROGRESS_CACHE_TIMEOUT = 1
+CARE_PLAN_FILE_CACHE_TIMEOUT = 7 * 86400
+
+
+def _cache_get(key):
+    try:
+        return cache.get(key)
+    except Exception as e:
+        logger.warning("Order cache unavailable: %s", e)
+        return None
+
+
+def _cache_set(key, value, final):
+    """final：结果已经定下来不会再变（completed 且有 care plan 内容）"""
+    timeout = COMPLETED_CACHE_TIMEOUT if final else IN_PROGRESS_CACHE_TIMEOUT
+    try:
+        cache.set(key, value, timeout=timeout)
+    except Exception as e:
+        logger.warning("Order cache unavailable: %s", e)
+
+
+def invalidate_order_cache(*order_ids):
+    """task 改完状态后调用，下一次读会重新查库"""
+    keys = [
+        key.format(order_id)
+        for order_id in order_ids
+        for key in (ORDER_STATUS_CACHE_KEY, CARE_PLAN_DETAIL_CACHE_KEY, CARE_PLAN_FILE_CACHE_KEY)
+    ]
+    try:
+        cache.delete_many(keys)
+    except Exception as e:
+        logger.warning("Order cache unavailable: %s", e)
+
+
 def get_order_status(order_id):
     """
     查询订单状态，返回 dict 或 None（订单不存在时）
     """
-    try:
-        order = Order.objects.get(pk=order_id)
-    except Order.DoesNotExist:
+    key = ORDER_STATUS_CACHE_KEY.format(order_id)
+    data = _cache_get(key)
+    if data is not None:
+        return data
+
+    # values()：只 SELECT 这几列，返回 dict，不实例化 Order / Patient 模型
+    row = Order.objects.filter(pk=order_id).values(
+        'id', 'status', 'patient__first_name', 'patient__last_name',
+        'medication_name', 'care_plan__content',
+    ).first()
+    if row is None:
         return None
 
     data = {
-        'order_id': order.id,
-        'status': order.status,
-        'patient_first_name': order.patient.first_name,
-        'patient_last_name': order.patient.last_name,
-        'medication_name': order.medication_name,
+        'order_id': row['id'],
+        'status': row['status'],
+        'patient_first_name': row['patient__first_name'],
+        'patient_last_name': row['patient__last_name'],
+        'medication_name': row['medication_name'],
     }
 
-    if order.status == 'completed' and hasattr(order, 'care_plan'):
-        data['care_plan_content'] = order.care_plan.content
+    final = row['status'] == 'completed' and row['care_plan__content'] is not None
+    if final:
+        data['care_plan_content'] = row['care_plan__content']
 
+    _cache_set(key, data, final)
     return data
 
 
@@ -205,41 +313,48 @@ def get_care_plan_detail(order_id):
     返回 care plan 详情 dict
     如果出错，返回带 'error' key 的 dict
     """
-    try:
-        order = Order.objects.get(pk=order_id)
-    except Order.DoesNotExist:
+    key = CARE_PLAN_DETAIL_CACHE_KEY.format(order_id)
+    data = _cache_get(key)
+    if data is not None:
+        return data
+
+    row = Order.objects.filter(pk=order_id).values(
+        'id', 'status', 'patient__first_name', 'patient__last_name',
+        'medication_name', 'care_plan__content',
+    ).first()
+    if row is None:
         return {'error': 'Order does not exist'}
 
-    if order.status != 'completed' or not hasattr(order, 'care_plan'):
-        return {'error': 'Care plan not available'}
+    final = row['status'] == 'completed' and row['care_plan__content'] is not None
+    if not final:
+        # 错误结果只缓存 1 秒：completed 但 care plan 还没读到时，不能把 404 缓存一天
+        data = {'error': 'Care plan not available'}
+    else:
+        data = {
+            'order_id': row['id'],
+            'status': row['status'],
+            'patient_name': f"{row['patient__first_name']} {row['patient__last_name']}",
+            'medication': row['medication_name'],
+            'care_plan_content': row['care_plan__content'],
+        }
 
-    return {
-        'order_id': order.id,
-        'status': order.status,
-        'patient_name': f"{order.patient.first_name} {order.patient.last_name}",
-        'medication': order.medication_name,
-        'care_plan_content': order.care_plan.content,
-    }
+    _cache_set(key, data, final)
+    return data
 
 
 # ============================================================
 # 组装 Care Plan 下载文件
 # ============================================================
-def build_care_plan_file(order_id):
-    """
-    组装文件内容和文件名
-    成功：返回 (file_content_string, filename_string)
-    失败：返回 (None, error_message_string)
-    """
-    try:
-        order = Order.objects.get(pk=order_id)
-    except Order.DoesNotExist:
-        return (None, 'Order not found')
+# 文件名里不能出现的字符一次性替换成 _（一遍扫描，不是每个字符 replace 一遍）
+_FILENAME_SANITIZE = str.maketrans({' ': '_', '/': '_', '\\': '_', ':': '_'})
 
-    if order.status != 'completed' or not hasattr(order, 'care_plan'):
-        return (None, 'Care plan not available')
 
-    file_content = f"""PHARMACEUTICAL CARE PLAN
+_STREAM_CHUNK_CHARS = 8192
+
+
+def _care_plan_file_chunks(order):
+    """先 yield 文件头，再把 care plan 正文按 8 KB 切片 yield，不拼成一个大字符串"""
+    yield f"""PHARMACEUTICAL CARE PLAN
 {'='*50}
 Patient: {order.patient.first_name} {order.patient.last_name}
 MRN: {order.patient.mrn}
@@ -250,10 +365,64 @@ Primary Diagnosis: {order.primary_diagnosis}
 Generated: {order.created_at.strftime('%Y-%m-%d %H:%M')}
 {'='*50}
 
-{order.care_plan.content}
-"""
+""".encode('utf-8')
+
+    content = order.care_plan_content
+    for start in range(0, len(content), _STREAM_CHUNK_CHARS):
+        yield content[start:start + _STREAM_CHUNK_CHARS].encode('utf-8')
+    yield b"\n"
+
 
+def _care_plan_file_orders():
+    # 只取文件头要用的列，不把 patient_records / 诊断数组这些大字段也拉回来
+    return _order_with_care_plan('patient', 'provider').only(
+        'id', 'status', 'medication_name', 'primary_diagnosis', 'created_at', 'order_date',
+        'patient__first_name', 'patient__last_name', 'patient__mrn', 'patient__dob',
+        'provider__name', 'provider__npi',
+    )
+
+
+def _care_plan_filename(order):
     filename = f"careplan_{order.patient.mrn}_{order.medication_name}_{order.order_date}.txt"
-    filename = filename.replace(' ', '_').replace('/', '_')
+    return filename.translate(_FILENAME_SANITIZE)
+
+
+def cache_care_plan_files(*order_ids):
+    """
+    task 把订单标成 completed 之后调用：下载文件整个渲染好放进 Redis，
+    之后的下载只是一次 GET，不查库也不拼文件头
+    """
+    files = {
+        CARE_PLAN_FILE_CACHE_KEY.format(order.pk): (b''.join(_care_plan_file_chunks(order)), _care_plan_filename(order))
+        for order in _care_plan_file_orders().filter(pk__in=order_ids, status='completed')
+        if order.care_plan_content is not None
+    }
+    if not files:
+        return
+    try:
+        cache.set_many(files, timeout=CARE_PLAN_FILE_CACHE_TIMEOUT)
+    except Exception as e:
+        logger.warning("Order cache unavailable: %s", e)
+
+
+def build_care_plan_file(order_id):
+    """
+    组装文件内容和文件名
+    成功：返回 (bytes 块的迭代器, filename_string)，view 用 StreamingHttpResponse 边生成边发
+    失败：返回 (None, error_message_string)
+    """
+    cached = _cache_get(CARE_PLAN_FILE_CACHE_KEY.format(order_id))
+    if cached is not None:
+        blob, filename = cached
+        return (iter((blob,)), filename)
+
+    # 缓存没命中（过期 / Redis 不可用）：照旧查库，边生成边发
+    try:
+        order = _care_plan_file_orders().get(pk=order_id)
+    except Order.DoesNotExist:
+        return (None, 'Order not found')
+
+    if order.status != 'completed' or order.care_plan_content is None:
+        return (None, 'Care plan not available')
 
-    return (file_content, filename)
+    return (_care_plan_file_chunks(order), _care_plan_filename(order))
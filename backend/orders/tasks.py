@@ -3,39 +3,204 @@
 Celery 异步任务
 ==============
 Worker 从 Redis 队列取任务，调用 services 层的业务逻辑
+
+两条路径：
+- generate_care_plan_batch_task：正常路径，一批订单一起调 LLM，结果批量写库
+- generate_care_plan_task：单个订单，带指数退避重试；batch 里失败的订单回落到这里
+
+正常路径按 I/O 类型拆成三段，LLM 调用和数据库读写跑在不同的 worker 池上：
+  generate_care_plan_batch_task（prefork，读库 + 查缓存）
+    → call_llm_task（llm_io 队列，gevent pool，只做网络请求，不碰数据库）
+    → save_care_plans_task（prefork，写库）
+gevent 会 monkey-patch socket，psycopg2 是 C 扩展，不会跟着让出，所以写库的任务留在 prefork
 """
-from celery import shared_task
+import logging
+from functools import lru_cache
+
+import redis
+from celery import chain, shared_task
 from celery.exceptions import MaxRetriesExceededError
+from django.conf import settings
 
 from .models import Order, CarePlan
 
+logger = logging.getLogger(__name__)
+
+# 生成 care plan（prompt + 缓存 key）只用到这些列
+PROMPT_FIELDS = (
+    'id', 'medication_name', 'primary_diagnosis', 'additional_diagnoses',
+    'medication_history', 'patient_records',
+    'patient__first_name', 'patient__last_name', 'patient__dob', 'patient__mrn',
+    'provider__name', 'provider__npi',
+)
+
+PENDING_KEY = 'careplan:pending:{}'      # 每个长度分箱一个列表
+QUEUE_NAME = 'careplan_{}'               # 每个长度分箱一个 Celery 队列（各自的 worker）
+LLM_QUEUE = 'llm_io'                     # 纯网络 I/O 的 LLM 调用，gevent worker（-P gevent -c 200）
+
+
+@lru_cache(maxsize=1)
+def _redis():
+    # 和 Django cache 一样用有上限的连接池，进程内所有 enqueue / flush 共用
+    pool = redis.BlockingConnectionPool.from_url(
+        settings.REDIS_URL, max_connections=settings.REDIS_MAX_CONNECTIONS, timeout=5
+    )
+    return redis.Redis(connection_pool=pool)
+
+
+# ============================================================
+# 攒批（micro-batching）
+# ============================================================
+def enqueue_care_plan(order_id, length_bin='short'):
+    """
+    订单 id 先进对应分箱的 Redis 列表：
+    - 列表从空变成 1 个 → 开一个 BATCH_WINDOW 秒后的 flush（把这段时间进来的订单一起处理）
+    - 攒够 BATCH_SIZE 个 → 立刻 flush，不用等窗口
+    RPUSH / LPOP 都是原子操作，多个 web 进程同时 enqueue 也不会丢单或重复
+    """
+    pending = _redis().rpush(PENDING_KEY.format(length_bin), order_id)
+    if pending >= settings.CARE_PLAN_BATCH_SIZE:
+        flush_care_plan_batch_task.apply_async((length_bin,), queue=QUEUE_NAME.format(length_bin))
+    elif pending == 1:
+        flush_care_plan_batch_task.apply_async(
+            (length_bin,),
+            queue=QUEUE_NAME.format(length_bin),
+            countdown=settings.CARE_PLAN_BATCH_WINDOW,
+        )
+
+
+@shared_task
+def flush_care_plan_batch_task(length_bin='short'):
+    """从列表里最多取 BATCH_SIZE 个订单，交给 batch task；取完还有剩的就接着 flush"""
+    client = _redis()
+    key = PENDING_KEY.format(length_bin)
+    queue = QUEUE_NAME.format(length_bin)
+
+    order_ids = client.lpop(key, settings.CARE_PLAN_BATCH_SIZE)
+    if not order_ids:
+        return
+    generate_care_plan_batch_task.apply_async(
+        ([int(order_id) for order_id in order_ids],), kwargs={'length_bin': length_bin}, queue=queue
+    )
+    if client.llen(key):
+        flush_care_plan_batch_task.apply_async((length_bin,), queue=queue)
+
+
+@shared_task
+def generate_care_plan_batch_task(order_ids, length_bin='short'):
+    from .services import CarePlanService, invalidate_order_cache
+
+    orders = list(
+        Order.objects.select_related('patient', 'provider').only(*PROMPT_FIELDS).filter(pk__in=order_ids)
+    )
+    if not orders:
+        return
+
+    # N 个 save() → 1 个 UPDATE
+    # 状态变了就清响应缓存：重投 / 重跑的订单可能还挂着一天的 completed 缓存
+    found_ids = [order.pk for order in orders]
+    Order.objects.filter(pk__in=found_ids).update(status='processing')
+    invalidate_order_cache(*found_ids)
+
+    llm = CarePlanService().llm
+    keys, contents = llm.cached_care_plans(orders)
+    _save_care_plans([(order.pk, content) for order, content in zip(orders, contents) if content is not None])
+
+    misses = [(order, key) for order, key, content in zip(orders, keys, contents) if content is None]
+    if not misses:
+        return
+
+    # prompt 在这边拼好（要读 patient / provider），llm_io 那边只拿字符串，不用连数据库
+    chain(
+        call_llm_task.si([llm.build_prompt(order) for order, _ in misses]).set(queue=LLM_QUEUE),
+        save_care_plans_task.s(
+            [order.pk for order, _ in misses], [key for _, key in misses], length_bin
+        ).set(queue=QUEUE_NAME.format(length_bin)),
+    ).apply_async()
+
+
+@shared_task
+def call_llm_task(prompts):
+    """
+    跑在 llm_io 的 gevent worker 上：一个进程里几百个 task 同时等 LLM 的响应
+    这里只有网络 I/O（adapter 在 gevent 下走同步 HTTP 调用，每个 prompt 一个 greenlet），
+    返回和 prompts 一一对应的结果（失败为 None）
+    出了任何异常也返回全 None：chain 的下一步 save_care_plans_task 一定会跑，
+    把这批订单交给单个任务重试；否则它们会一直停在 processing
+    """
+    try:
+        from .LLMServices import get_LLM_adapter
+
+        return get_LLM_adapter().generate_from_prompts(prompts)
+    except Exception as e:
+        logger.exception("LLM batch call failed: %s", e)
+        return [None] * len(prompts)
+
+
+@shared_task
+def save_care_plans_task(contents, order_ids, keys, length_bin='short'):
+    from .LLMServices import get_LLM_adapter
+
+    get_LLM_adapter().store_care_plans(
+        {key: content for key, content in zip(keys, contents) if content is not None}
+    )
+    _save_care_plans([(order_id, content) for order_id, content in zip(order_ids, contents) if content is not None])
+
+    # 失败的订单走单个任务，用它的重试逻辑
+    for order_id, content in zip(order_ids, contents):
+        if content is None:
+            generate_care_plan_task.apply_async((order_id,), queue=QUEUE_NAME.format(length_bin))
+
+
+def _save_care_plans(done):
+    """done: [(order_id, content)]"""
+    from .services import cache_care_plan_files, invalidate_order_cache
+
+    if not done:
+        return
+    # 一条多行 INSERT ... ON CONFLICT (order_id) DO UPDATE：重试 / 重复投递也是幂等的
+    CarePlan.objects.bulk_create(
+        [CarePlan(order_id=order_id, content=content) for order_id, content in done],
+        update_conflicts=True,
+        update_fields=['content'],
+        unique_fields=['order'],
+    )
+    Order.objects.filter(pk__in=[order_id for order_id, _ in done]).update(status='completed')
+    invalidate_order_cache(*(order_id for order_id, _ in done))
+    cache_care_plan_files(*(order_id for order_id, _ in done))
+
 
 @shared_task(bind=True, max_retries=3)
 def generate_care_plan_task(self, order_id):
-    from .services import CarePlanService
+    from .services import CarePlanService, cache_care_plan_files, invalidate_order_cache
 
-    try:
-        order = Order.objects.get(id=order_id)
-    except Order.DoesNotExist:
-        print(f"❌ Order {order_id} not found, skipping")
+    # 一条 UPDATE 直接改状态，不用先 get 再 save（save 会把整行所有字段写回去）
+    if not Order.objects.filter(pk=order_id).update(status='processing'):
+        logger.warning("Order %s not found, skipping", order_id)
         return
+    invalidate_order_cache(order_id)
 
     try:
-        order.status = 'processing'
-        order.save()
+        order = (
+            Order.objects.select_related('patient', 'provider')
+            .only(*PROMPT_FIELDS)
+            .get(pk=order_id)
+        )
         services = CarePlanService()
         content = services.generate_care_plan(order)
 
         if content is None:
             raise Exception("LLM returned None")
 
-        CarePlan.objects.create(order=order, content=content)
-        order.status = 'completed'
-        order.save()
+        # 重试时 CarePlan 可能已经写过了（OneToOne），update_or_create 保证幂等
+        CarePlan.objects.update_or_create(order_id=order_id, defaults={'content': content})
+        Order.objects.filter(pk=order_id).update(status='completed')
+        invalidate_order_cache(order_id)
+        cache_care_plan_files(order_id)
 
     except MaxRetriesExceededError:
-        order.status = 'failed'
-        order.save()
+        Order.objects.filter(pk=order_id).update(status='failed')
+        invalidate_order_cache(order_id)
 
     except Exception as e:
         raise self.retry(
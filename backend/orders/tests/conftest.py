@@ -9,10 +9,27 @@ pytest 会自动注入，不需要你手动调用。
 """
 import pytest
 from datetime import date
+from unittest.mock import MagicMock
 from django.utils import timezone
 from orders.models import Patient, Provider, Order
 
 
+# ============================================================
+# Celery
+# ============================================================
+
+@pytest.fixture(autouse=True)
+def mock_celery(monkeypatch):
+    """
+    所有测试都不真的发 Celery 任务：一个 monkeypatch.setattr 换掉入口，
+    不用每个测试再套一层 @patch
+    需要检查调用情况的测试直接拿 mock_celery 这个参数
+    """
+    mock = MagicMock()
+    monkeypatch.setattr('orders.services.submit_care_plan_task', mock)
+    return mock
+
+
 # ============================================================
 # 基础数据 Fixtures
 # ============================================================
@@ -9,8 +9,8 @@ External Intake API Integration Tests
 Celery task 被 mock 掉，不真的发异步任务
 """
 
+import orjson
 import pytest
-from unittest.mock import patch
 from rest_framework.test import APIClient
 from orders.models import Order, Patient, Provider
 
@@ -37,18 +37,26 @@ def clinic_b_payload():
     }
 
 
+@pytest.fixture
+def clinic_b_body(clinic_b_payload):
+    """
+    预先编码好的请求体：不改 payload 的测试直接发 bytes，
+    省掉每次 post(format='json') 时的 json.dumps
+    """
+    return orjson.dumps(clinic_b_payload)
+
+
 # ============================================================
 # 正常流程测试
 # ============================================================
 
 @pytest.mark.django_db
-@patch('orders.services.submit_care_plan_task')
-def test_clinic_b_creates_order_successfully(mock_task, api_client, clinic_b_payload):
+def test_clinic_b_creates_order_successfully(api_client, clinic_b_body):
     """Clinic B 正常数据 → 201 + 订单创建成功"""
     response = api_client.post(
         '/api/intake/?source=clinic_b',
-        data=clinic_b_payload,
-        format='json'
+        data=clinic_b_body,
+        content_type='application/json'
     )
     assert response.status_code == 201 or response.status_code == 202
     assert 'order_id' in response.data
@@ -62,23 +70,22 @@ def test_clinic_b_creates_order_successfully(mock_task, api_client, clinic_b_pay
 
 
 @pytest.mark.django_db
-@patch('orders.services.submit_care_plan_task')
-def test_clinic_b_triggers_async_task(mock_task, api_client, clinic_b_payload):
+def test_clinic_b_triggers_async_task(mock_celery, api_client, clinic_b_body):
     """外部数据源也应该触发 care plan 异步生成"""
     response = api_client.post(
         '/api/intake/?source=clinic_b',
-        data=clinic_b_payload,
-        format='json'
+        data=clinic_b_body,
+        content_type='application/json'
     )
     # submit_care_plan_task 应该被调用了一次
-    assert mock_task.called
+    assert mock_celery.called
     order_id = response.data['order_id']
-    mock_task.assert_called_once_with(order_id)
+    mock_celery.assert_called_once()
+    assert mock_celery.call_args.args[0].pk == order_id
 
 
 @pytest.mark.django_db
-@patch('orders.services.submit_care_plan_task')
-def test_cvs_web_source_works(mock_task, api_client):
+def test_cvs_web_source_works(api_client):
     """CVS web form 数据通过 intake API 也能成功"""
     payload = {
         "patient": {
@@ -108,24 +115,24 @@ def test_cvs_web_source_works(mock_task, api_client):
 # ============================================================
 
 @pytest.mark.django_db
-def test_missing_source_returns_400(api_client, clinic_b_payload):
+def test_missing_source_returns_400(api_client, clinic_b_body):
     """缺少 source 参数 → 400"""
     response = api_client.post(
         '/api/intake/',  # 没有 ?source=xxx
-        data=clinic_b_payload,
-        format='json'
+        data=clinic_b_body,
+        content_type='application/json'
     )
     assert response.status_code == 400
     assert 'source' in str(response.data).lower() or 'error' in response.data
 
 
 @pytest.mark.django_db
-def test_unknown_source_returns_400(api_client, clinic_b_payload):
+def test_unknown_source_returns_400(api_client, clinic_b_body):
     """不存在的 source → 400"""
     response = api_client.post(
         '/api/intake/?source=unknown_hospital',
-        data=clinic_b_payload,
-        format='json'
+        data=clinic_b_body,
+        content_type='application/json'
     )
     assert response.status_code == 400
 
@@ -160,8 +167,7 @@ def test_clinic_b_missing_required_field_returns_400(api_client):
 # ============================================================
 
 @pytest.mark.django_db
-@patch('orders.services.submit_care_plan_task')
-def test_provider_npi_conflict_through_intake(mock_task, api_client, clinic_b_payload):
+def test_provider_npi_conflict_through_intake(api_client, clinic_b_payload):
     """外部数据也应该触发 Provider NPI 冲突检测"""
     # 先创建一个 Provider
     Provider.objects.create(name="Dr. Existing", npi="9876543210")
@@ -181,30 +187,28 @@ def test_provider_npi_conflict_through_intake(mock_task, api_client, clinic_b_pa
 
 
 @pytest.mark.django_db
-@patch('orders.services.submit_care_plan_task')
-def test_duplicate_order_same_day_through_intake(mock_task, api_client, clinic_b_payload):
+def test_duplicate_order_same_day_through_intake(api_client, clinic_b_body):
     """外部数据也应该触发同天重复订单检测"""
     # 先创建第一个订单
     response1 = api_client.post(
         '/api/intake/?source=clinic_b',
-        data=clinic_b_payload,
-        format='json'
+        data=clinic_b_body,
+        content_type='application/json'
     )
     assert response1.status_code in (201, 202)
 
     # 同一天再提交相同患者+相同药
     response2 = api_client.post(
         '/api/intake/?source=clinic_b',
-        data=clinic_b_payload,
-        format='json'
+        data=clinic_b_body,
+        content_type='application/json'
     )
     assert response2.status_code == 409
     assert response2.data.get('code') == 'ORDER_SAME_DAY_DUPLICATE'
 
 
 @pytest.mark.django_db
-@patch('orders.services.submit_care_plan_task')
-def test_patient_reuse_through_intake(mock_task, api_client, clinic_b_payload):
+def test_patient_reuse_through_intake(api_client, clinic_b_payload):
     """相同患者信息第二次提交应该复用已有 Patient 记录"""
     # 第一次提交
     api_client.post('/api/intake/?source=clinic_b', data=clinic_b_payload, format='json')
@@ -9,7 +9,6 @@ Unit Test vs Integration Test:
 - Integration: POST /api/orders/ {mrn: '123456', ...} → HTTP 200 + warning JSON?
 """
 import pytest
-from unittest.mock import patch
 from rest_framework.test import APIClient
 from datetime import date
 from django.utils import timezone
@@ -27,8 +26,7 @@ def api_client():
 # ============================================================
 
 @pytest.mark.django_db
-@patch('orders.services.submit_care_plan_task')  # mock 掉 Celery，不真的发任务
-def test_create_order_success(mock_task, api_client, sample_order_payload):
+def test_create_order_success(mock_celery, api_client, sample_order_payload):
     """
     正常提交一个新订单，应该：
     - 返回 202
@@ -41,13 +39,12 @@ def test_create_order_success(mock_task, api_client, sample_order_payload):
     assert Patient.objects.count() == 1
     assert Provider.objects.count() == 1
     assert Order.objects.count() == 1
-    mock_task.assert_called_once()  # 确认 Celery task 被触发了
+    mock_celery.assert_called_once()  # 确认 Celery task 被触发了
 
 
 @pytest.mark.django_db
-@patch('orders.services.submit_care_plan_task')
-def test_reuse_existing_patient_and_provider(mock_task, api_client, sample_order_payload,
-                                              existing_patient, existing_provider):
+def test_reuse_existing_patient_and_provider(api_client, sample_order_payload,
+                                             existing_patient, existing_provider):
     """
     提交的 Patient 和 Provider 已存在（MRN+名字+DOB 完全匹配），
     应该复用而不是创建新的
@@ -95,9 +92,8 @@ def test_patient_mrn_mismatch_returns_warning(api_client, sample_order_payload,
 
 
 @pytest.mark.django_db
-@patch('orders.services.submit_care_plan_task')
-def test_patient_warning_with_confirm_creates_order(mock_task, api_client,
-                                                      sample_order_payload, existing_patient):
+def test_patient_warning_with_confirm_creates_order(api_client,
+                                                    sample_order_payload, existing_patient):
     """Patient 有 warning 但 confirm=True → 跳过警告，成功创建"""
     sample_order_payload['patient_first_name'] = 'John'
     sample_order_payload['patient_last_name'] = 'Smith'
@@ -133,9 +129,8 @@ def test_different_day_order_returns_warning(api_client, sample_order_payload, o
 
 
 @pytest.mark.django_db
-@patch('orders.services.submit_care_plan_task')
-def test_different_day_order_with_confirm_succeeds(mock_task, api_client,
-                                                     sample_order_payload, old_order):
+def test_different_day_order_with_confirm_succeeds(api_client,
+                                                   sample_order_payload, old_order):
     """同患者 + 同药 + 不同天 + confirm=True → 成功"""
     sample_order_payload['confirm'] = True
     response = api_client.post('/api/orders/', sample_order_payload, format='json')
@@ -177,7 +172,34 @@ def test_get_orders_list(api_client, existing_order):
     response = api_client.get('/api/orders/')
 
     assert response.status_code == 200
-    assert len(response.data) >= 1
+    assert response.data['count'] >= 1
+    assert len(response.data['results']) >= 1
+
+
+@pytest.mark.django_db
+def test_get_orders_list_omits_care_plan_content(api_client, existing_order):
+    """列表只返回 has_care_plan，不返回 care plan 正文和大字段"""
+    response = api_client.get('/api/orders/')
+
+    row = response.data['results'][0]
+    assert row['has_care_plan'] is False
+    assert 'care_plan_content' not in row
+    assert 'patient_records' not in row
+
+
+@pytest.mark.parametrize('search, expected', [
+    ('jan', 1),      # 名字的一部分，不区分大小写
+    ('DOE', 1),      # 姓
+    ('1234', 1),     # MRN 的一部分
+    ('ivig', 1),     # 药名
+    ('zzz', 0),
+])
+@pytest.mark.django_db
+def test_search_orders(api_client, existing_order, search, expected):
+    """?search= 在姓名、MRN、药名里做子串匹配"""
+    response = api_client.get('/api/orders/', {'search': search})
+
+    assert response.data['count'] == expected
 
 
 @pytest.mark.django_db
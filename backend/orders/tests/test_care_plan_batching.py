@@ -0,0 +1,307 @@
+"""
+test_care_plan_batching.py — Redis 攒批 + 批量生成 care plan
+==========================================================
+测试 tasks.py 里的整条批处理路径：
+enqueue_care_plan → flush_care_plan_batch_task → generate_care_plan_batch_task
+  → call_llm_task → save_care_plans_task / _save_care_plans
+Redis 和 LLM 都换成 MagicMock，Celery 的下一步任务也不真的发出去
+"""
+from unittest.mock import MagicMock
+
+import pytest
+from django.test.utils import override_settings
+
+from orders import tasks
+from orders.LLMServices.gemini import GeminiAdapter
+from orders.models import CarePlan, Order
+
+LOCMEM_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+# ============================================================
+# Fixtures
+# ============================================================
+
+@pytest.fixture
+def mock_redis(monkeypatch):
+    """enqueue / flush 拿到的 Redis client"""
+    client = MagicMock()
+    monkeypatch.setattr(tasks, '_redis', lambda: client)
+    return client
+
+
+@pytest.fixture
+def mock_flush(monkeypatch):
+    """换掉模块里的 flush task（enqueue 和 flush 自己续批都是通过它发出去的）"""
+    mock = MagicMock()
+    monkeypatch.setattr(tasks, 'flush_care_plan_batch_task', mock)
+    return mock
+
+
+@pytest.fixture
+def mock_llm(monkeypatch):
+    """CarePlanService().llm / get_LLM_adapter() 拿到的都是同一个假 adapter"""
+    llm = MagicMock()
+    llm.build_prompt.side_effect = lambda order: f"prompt {order.pk}"
+    monkeypatch.setattr('orders.services.get_LLM_adapter', lambda: llm)
+    monkeypatch.setattr('orders.LLMServices.get_LLM_adapter', lambda: llm)
+    return llm
+
+
+@pytest.fixture
+def two_orders(existing_order, existing_patient, existing_provider):
+    second = Order.objects.create(
+        patient=existing_patient,
+        provider=existing_provider,
+        medication_name='Rituximab',
+        primary_diagnosis='G70.01',
+        status='pending',
+    )
+    return [existing_order, second]
+
+
+# ============================================================
+# enqueue_care_plan
+# ============================================================
+
+@override_settings(CARE_PLAN_BATCH_SIZE=3, CARE_PLAN_BATCH_WINDOW=0.2)
+def test_first_item_schedules_windowed_flush(mock_redis, mock_flush):
+    """列表从空变成 1 个：开一个 BATCH_WINDOW 秒后的 flush"""
+    mock_redis.rpush.return_value = 1
+
+    tasks.enqueue_care_plan(7, 'long')
+
+    mock_redis.rpush.assert_called_once_with('careplan:pending:long', 7)
+    mock_flush.apply_async.assert_called_once_with(('long',), queue='careplan_long', countdown=0.2)
+
+
+@override_settings(CARE_PLAN_BATCH_SIZE=3)
+def test_middle_item_does_not_flush(mock_redis, mock_flush):
+    """窗口已经开了，又没攒够：什么都不发"""
+    mock_redis.rpush.return_value = 2
+
+    tasks.enqueue_care_plan(7)
+
+    mock_flush.apply_async.assert_not_called()
+
+
+@override_settings(CARE_PLAN_BATCH_SIZE=3)
+def test_full_batch_flushes_immediately(mock_redis, mock_flush):
+    """攒够 BATCH_SIZE：立刻 flush，不带 countdown"""
+    mock_redis.rpush.return_value = 3
+
+    tasks.enqueue_care_plan(7)
+
+    mock_flush.apply_async.assert_called_once_with(('short',), queue='careplan_short')
+
+
+# ============================================================
+# flush_care_plan_batch_task
+# ============================================================
+
+@override_settings(CARE_PLAN_BATCH_SIZE=3)
+def test_flush_hands_batch_to_generate_task(monkeypatch, mock_redis):
+    flush = tasks.flush_care_plan_batch_task
+    requeue = MagicMock()
+    generate = MagicMock()
+    monkeypatch.setattr(tasks, 'flush_care_plan_batch_task', requeue)
+    monkeypatch.setattr(tasks, 'generate_care_plan_batch_task', generate)
+    mock_redis.lpop.return_value = [b'1', b'2', b'3']
+    mock_redis.llen.return_value = 0
+
+    flush('short')
+
+    mock_redis.lpop.assert_called_once_with('careplan:pending:short', 3)
+    generate.apply_async.assert_called_once_with(
+        ([1, 2, 3],), kwargs={'length_bin': 'short'}, queue='careplan_short'
+    )
+    requeue.apply_async.assert_not_called()
+
+
+@override_settings(CARE_PLAN_BATCH_SIZE=3)
+def test_flush_requeues_when_list_not_drained(monkeypatch, mock_redis):
+    """取完一批还有剩的：接着再发一个 flush"""
+    flush = tasks.flush_care_plan_batch_task
+    requeue = MagicMock()
+    monkeypatch.setattr(tasks, 'flush_care_plan_batch_task', requeue)
+    monkeypatch.setattr(tasks, 'generate_care_plan_batch_task', MagicMock())
+    mock_redis.lpop.return_value = [b'1', b'2', b'3']
+    mock_redis.llen.return_value = 2
+
+    flush('short')
+
+    requeue.apply_async.assert_called_once_with(('short',), queue='careplan_short')
+
+
+def test_flush_empty_list_does_nothing(monkeypatch, mock_redis):
+    flush = tasks.flush_care_plan_batch_task
+    generate = MagicMock()
+    monkeypatch.setattr(tasks, 'generate_care_plan_batch_task', generate)
+    mock_redis.lpop.return_value = None
+
+    flush('short')
+
+    generate.apply_async.assert_not_called()
+
+
+# ============================================================
+# generate_care_plan_batch_task
+# ============================================================
+
+@pytest.mark.django_db
+@override_settings(CACHES=LOCMEM_CACHE)
+def test_batch_saves_cache_hits_and_sends_misses_to_llm(monkeypatch, mock_llm, two_orders):
+    """命中缓存的直接存库；没命中的拼好 prompt 交给 llm_io 队列"""
+    hit, miss = two_orders
+    mock_chain = MagicMock()
+    monkeypatch.setattr(tasks, 'chain', mock_chain)
+    mock_llm.cached_care_plans.side_effect = lambda orders: (
+        [f"key-{order.pk}" for order in orders],
+        ['cached plan' if order.pk == hit.pk else None for order in orders],
+    )
+
+    tasks.generate_care_plan_batch_task([hit.pk, miss.pk])
+
+    hit.refresh_from_db()
+    miss.refresh_from_db()
+    assert hit.status == 'completed'
+    assert hit.care_plan.content == 'cached plan'
+    assert miss.status == 'processing'
+    assert not CarePlan.objects.filter(order=miss).exists()
+
+    call_llm, save = mock_chain.call_args.args
+    assert call_llm.args == ([f"prompt {miss.pk}"],)
+    assert call_llm.options['queue'] == tasks.LLM_QUEUE
+    assert save.args == ([miss.pk], [f"key-{miss.pk}"], 'short')
+    mock_chain.return_value.apply_async.assert_called_once_with()
+
+
+@pytest.mark.django_db
+@override_settings(CACHES=LOCMEM_CACHE)
+def test_batch_all_cached_skips_llm(monkeypatch, mock_llm, two_orders):
+    mock_chain = MagicMock()
+    monkeypatch.setattr(tasks, 'chain', mock_chain)
+    mock_llm.cached_care_plans.side_effect = lambda orders: (
+        [f"key-{order.pk}" for order in orders], ['cached plan'] * len(orders)
+    )
+
+    tasks.generate_care_plan_batch_task([order.pk for order in two_orders])
+
+    assert Order.objects.filter(status='completed').count() == 2
+    mock_chain.assert_not_called()
+
+
+@pytest.mark.django_db
+@override_settings(CACHES=LOCMEM_CACHE)
+def test_batch_processing_drops_stale_status_cache(monkeypatch, mock_llm, existing_order):
+    """重跑一个之前 completed 的订单：改回 processing 后不能再返回缓存里一天的 completed"""
+    from orders import services
+
+    monkeypatch.setattr(tasks, 'chain', MagicMock())
+    mock_llm.cached_care_plans.side_effect = lambda orders: (['key'] * len(orders), [None] * len(orders))
+    Order.objects.filter(pk=existing_order.pk).update(status='completed')
+    CarePlan.objects.create(order=existing_order, content='old plan')
+    assert services.get_order_status(existing_order.pk)['status'] == 'completed'   # 缓存一天
+
+    tasks.generate_care_plan_batch_task([existing_order.pk])
+
+    assert services.get_order_status(existing_order.pk)['status'] == 'processing'
+
+
+# ============================================================
+# call_llm_task
+# ============================================================
+
+def test_call_llm_task_returns_results(mock_llm):
+    mock_llm.generate_from_prompts.return_value = ['plan a', None]
+
+    assert tasks.call_llm_task(['a', 'b']) == ['plan a', None]
+
+
+def test_call_llm_task_failure_returns_all_none(mock_llm):
+    """整批调用抛异常：返回全 None，save_care_plans_task 照样会把订单交给单个任务重试"""
+    mock_llm.generate_from_prompts.side_effect = RuntimeError('adapter down')
+
+    assert tasks.call_llm_task(['a', 'b', 'c']) == [None, None, None]
+
+
+# ============================================================
+# save_care_plans_task / _save_care_plans
+# ============================================================
+
+@pytest.mark.django_db
+@override_settings(CACHES=LOCMEM_CACHE)
+def test_save_task_stores_successes_and_retries_failures(monkeypatch, mock_llm, two_orders):
+    done, failed = two_orders
+    single = MagicMock()
+    monkeypatch.setattr(tasks, 'generate_care_plan_task', single)
+
+    tasks.save_care_plans_task(['new plan', None], [done.pk, failed.pk], ['key-a', 'key-b'], 'long')
+
+    # 只缓存成功的结果
+    mock_llm.store_care_plans.assert_called_once_with({'key-a': 'new plan'})
+    done.refresh_from_db()
+    assert done.status == 'completed'
+    assert done.care_plan.content == 'new plan'
+    # 失败的订单走单个任务（带重试），进原来的分箱队列
+    assert not CarePlan.objects.filter(order=failed).exists()
+    single.apply_async.assert_called_once_with((failed.pk,), queue='careplan_long')
+
+
+@pytest.mark.django_db
+@override_settings(CACHES=LOCMEM_CACHE)
+def test_save_overwrites_existing_care_plan(existing_order):
+    """重复投递 / 重试：ON CONFLICT (order_id) DO UPDATE，不会撞 OneToOne 的唯一约束"""
+    CarePlan.objects.create(order=existing_order, content='old plan')
+
+    tasks._save_care_plans([(existing_order.pk, 'new plan')])
+    tasks._save_care_plans([(existing_order.pk, 'new plan')])
+
+    assert CarePlan.objects.filter(order=existing_order).count() == 1
+    existing_order.refresh_from_db()
+    assert existing_order.care_plan.content == 'new plan'
+    assert existing_order.status == 'completed'
+
+
+# ============================================================
+# GeminiAdapter._call_api_many
+# ============================================================
+
+class _Chunk:
+    def __init__(self, text):
+        self._text = text
+
+    @property
+    def text(self):
+        # 被安全过滤拦下 / 候选为空时，真实 SDK 的 .text 会抛 ValueError
+        if self._text is None:
+            raise ValueError('response was blocked')
+        return self._text
+
+
+class FakeGeminiModel:
+    def generate_content(self, prompt, stream=False):
+        if prompt == 'bad':
+            raise RuntimeError('quota exceeded')
+        if prompt == 'blocked':
+            return [_Chunk(None)]
+        return [_Chunk('plan for '), _Chunk(prompt)]
+
+
+def test_call_api_many_maps_failures_to_none(monkeypatch):
+    """某个 prompt 抛异常 / 被拦下只让它自己的位置变成 None，其他结果照常返回"""
+    monkeypatch.setattr('orders.LLMServices.gemini._get_gemini_model', lambda: FakeGeminiModel())
+
+    results = GeminiAdapter()._call_api_many(['a', 'bad', 'blocked', 'c'])
+
+    assert results == ['plan for a', None, None, 'plan for c']
+
+
+def test_call_api_many_works_for_every_batch(monkeypatch):
+    """同一个进程里连着跑多批（缓存的 model 不能只在第一批能用）"""
+    monkeypatch.setattr('orders.LLMServices.gemini._get_gemini_model', lambda: FakeGeminiModel())
+    llm = GeminiAdapter()
+
+    assert llm._call_api_many(['a']) == ['plan for a']
+    assert llm._call_api_many(['b', 'c']) == ['plan for b', 'plan for c']
+    assert llm._call_api_many([]) == []
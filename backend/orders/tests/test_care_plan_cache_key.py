@@ -0,0 +1,89 @@
+"""
+test_care_plan_cache_key.py — care plan 结果缓存的 key
+====================================================
+prompt 里有患者姓名 / DOB / MRN 和 provider，生成的 care plan 也会写上这些；
+两个患者临床信息一样、身份不一样时，谁都不能拿到对方的 care plan
+"""
+from datetime import date
+
+import pytest
+from django.test.utils import override_settings
+
+from orders.LLMServices.base import BaseLLMAdapter, care_plan_cache_key
+from orders.models import Order, Patient, Provider
+
+LOCMEM_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+class EchoAdapter(BaseLLMAdapter):
+    """假的 LLM：把 prompt 原样当 care plan 返回，顺便记下调用了几次"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def _call_api(self, prompt):
+        self.calls += 1
+        return f"Care plan for:\n{prompt}"
+
+
+def make_order(first_name, last_name, mrn, dob):
+    # 不落库：生成 care plan 只读内存里的字段
+    return Order(
+        patient=Patient(first_name=first_name, last_name=last_name, mrn=mrn, dob=dob),
+        provider=Provider(name='Dr. Sarah Johnson', npi='1234567890'),
+        medication_name='IVIG',
+        primary_diagnosis='G70.01',
+        additional_diagnoses=['I10'],
+        medication_history=['Prednisone'],
+        patient_records='Stable.',
+    )
+
+
+@pytest.fixture
+def jane():
+    return make_order('Jane', 'Doe', '111111', date(1979, 6, 8))
+
+
+@pytest.fixture
+def john():
+    return make_order('John', 'Smith', '222222', date(1950, 1, 2))
+
+
+@pytest.fixture(autouse=True)
+def locmem_cache():
+    with override_settings(CACHES=LOCMEM_CACHE):
+        from django.core.cache import cache
+        cache.clear()
+        yield
+
+
+def test_key_differs_when_only_identity_differs(jane, john):
+    assert care_plan_cache_key(jane) != care_plan_cache_key(john)
+
+
+def test_key_same_for_identical_inputs(jane):
+    twin = make_order('Jane', 'Doe', '111111', date(1979, 6, 8))
+    assert care_plan_cache_key(jane) == care_plan_cache_key(twin)
+
+
+def test_cached_plan_not_served_to_other_patient(jane, john):
+    """Jane 的结果进了缓存之后，John 还是要自己生成，内容里没有 Jane"""
+    llm = EchoAdapter()
+    jane_plan = llm.generate_care_plan(jane)
+    john_plan = llm.generate_care_plan(john)
+
+    assert llm.calls == 2
+    assert 'Doe' in jane_plan and '222222' not in jane_plan
+    assert 'Smith' in john_plan and 'Doe' not in john_plan and '111111' not in john_plan
+
+
+def test_batch_cache_lookup_does_not_share_plans_across_patients(jane, john):
+    """批处理路径（cached_care_plans / store_care_plans）：Jane 的结果只有 Jane 能命中"""
+    llm = EchoAdapter()
+    jane_key = care_plan_cache_key(jane)
+    llm.store_care_plans({jane_key: 'plan for Jane Doe'})
+
+    keys, contents = llm.cached_care_plans([jane, john])
+
+    assert keys == [jane_key, care_plan_cache_key(john)]
+    assert contents == ['plan for Jane Doe', None]
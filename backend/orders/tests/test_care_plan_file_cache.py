@@ -0,0 +1,51 @@
+"""
+test_care_plan_file_cache.py — 预渲染的下载文件缓存
+==================================================
+测试 services.cache_care_plan_files() / build_care_plan_file()：
+task 完成时把文件渲染进缓存，之后的下载不再查库
+"""
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext, override_settings
+
+from orders import services
+from orders.models import CarePlan, Order
+
+LOCMEM_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+@pytest.fixture
+def completed_order(existing_order):
+    CarePlan.objects.create(order=existing_order, content='1. Problem List ...')
+    Order.objects.filter(pk=existing_order.pk).update(status='completed')
+    return existing_order
+
+
+@pytest.mark.django_db
+@override_settings(CACHES=LOCMEM_CACHE)
+def test_cached_file_is_served_without_queries(completed_order):
+    """缓存命中时下载内容和现查的一样，而且 0 次查询"""
+    chunks, filename = services.build_care_plan_file(completed_order.pk)
+    expected = b''.join(chunks)
+
+    services.cache_care_plan_files(completed_order.pk)
+    with CaptureQueriesContext(connection) as queries:
+        chunks, cached_filename = services.build_care_plan_file(completed_order.pk)
+        body = b''.join(chunks)
+
+    assert len(queries) == 0
+    assert body == expected
+    assert cached_filename == filename
+
+
+@pytest.mark.django_db
+@override_settings(CACHES=LOCMEM_CACHE)
+def test_invalidate_drops_cached_file(completed_order):
+    """状态变了（invalidate_order_cache）之后回落到查库"""
+    services.cache_care_plan_files(completed_order.pk)
+    services.invalidate_order_cache(completed_order.pk)
+    Order.objects.filter(pk=completed_order.pk).update(status='processing')
+
+    chunks, error = services.build_care_plan_file(completed_order.pk)
+    assert chunks is None
+    assert error == 'Care plan not available'
@@ -0,0 +1,60 @@
+"""
+test_care_plan_length_bin.py — care plan 长度分箱 Unit Test
+==========================================================
+测试 services.care_plan_length_bin()：决定订单进 careplan_short 还是 careplan_long 队列
+"""
+from unittest.mock import MagicMock
+
+import pytest
+
+# conftest 的 mock_celery 会换掉 services.submit_care_plan_task，这里先拿到真的那个
+from orders.services import care_plan_length_bin, submit_care_plan_task
+
+
+def test_short_records_few_diagnoses_is_short():
+    """病历短 + 合并诊断少 → short"""
+    assert care_plan_length_bin('Stable on therapy.', ['I10']) == 'short'
+
+
+def test_empty_fields_are_short():
+    """空病历 / 空诊断列表也算 short（None 也要能处理）"""
+    assert care_plan_length_bin('', []) == 'short'
+    assert care_plan_length_bin(None, None) == 'short'
+
+
+def test_long_records_is_long():
+    """病历超过 500 字符 → long"""
+    assert care_plan_length_bin('x' * 500, []) == 'long'
+
+
+def test_many_diagnoses_is_long():
+    """合并诊断 >= 3 个 → long"""
+    assert care_plan_length_bin('', ['I10', 'E11.9', 'K21.0']) == 'long'
+
+
+@pytest.mark.django_db
+def test_submit_enqueues_after_commit(monkeypatch, existing_order, django_capture_on_commit_callbacks):
+    """事务提交前不进 Redis 队列，提交后按分箱进队"""
+    enqueue = MagicMock()
+    monkeypatch.setattr('orders.services.enqueue_care_plan', enqueue)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        submit_care_plan_task(existing_order)
+        enqueue.assert_not_called()
+
+    enqueue.assert_called_once_with(existing_order.pk, 'short')
+
+
+@pytest.mark.django_db
+def test_submit_bins_from_order_fields_without_query(
+    monkeypatch, existing_order, django_capture_on_commit_callbacks, django_assert_num_queries
+):
+    """分箱用传进来的订单实例上的字段，不再为了分箱查一次库"""
+    enqueue = MagicMock()
+    monkeypatch.setattr('orders.services.enqueue_care_plan', enqueue)
+    existing_order.patient_records = 'x' * 500
+
+    with django_capture_on_commit_callbacks(execute=True), django_assert_num_queries(0):
+        submit_care_plan_task(existing_order)
+
+    enqueue.assert_called_once_with(existing_order.pk, 'long')
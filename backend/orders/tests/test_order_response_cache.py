@@ -0,0 +1,56 @@
+"""
+test_order_response_cache.py — 状态 / 详情接口的响应缓存
+======================================================
+测试 services.get_order_status() / get_care_plan_detail() 的缓存时长：
+只有 completed 且 care plan 已经在库里的结果缓存一天，其余只缓存 1 秒
+"""
+from unittest.mock import MagicMock
+
+import pytest
+
+from orders import services
+from orders.models import CarePlan, Order
+
+
+@pytest.fixture
+def mock_cache(monkeypatch):
+    cache = MagicMock()
+    cache.get.return_value = None       # 每次都是缓存未命中，走查库
+    monkeypatch.setattr(services, 'cache', cache)
+    return cache
+
+
+@pytest.fixture
+def completed_without_care_plan(existing_order):
+    Order.objects.filter(pk=existing_order.pk).update(status='completed')
+    return existing_order
+
+
+@pytest.mark.django_db
+def test_detail_error_is_not_cached_for_a_day(mock_cache, completed_without_care_plan):
+    """completed 但读不到 care plan：404 结果只缓存 1 秒"""
+    data = services.get_care_plan_detail(completed_without_care_plan.pk)
+
+    assert data == {'error': 'Care plan not available'}
+    mock_cache.set.assert_called_once_with(
+        f'order:careplan:{completed_without_care_plan.pk}', data,
+        timeout=services.IN_PROGRESS_CACHE_TIMEOUT,
+    )
+
+
+@pytest.mark.django_db
+def test_detail_success_is_cached_for_a_day(mock_cache, completed_without_care_plan):
+    CarePlan.objects.create(order=completed_without_care_plan, content='1. Problem List ...')
+
+    data = services.get_care_plan_detail(completed_without_care_plan.pk)
+
+    assert data['care_plan_content'] == '1. Problem List ...'
+    assert mock_cache.set.call_args.kwargs['timeout'] == services.COMPLETED_CACHE_TIMEOUT
+
+
+@pytest.mark.django_db
+def test_status_without_care_plan_is_not_cached_for_a_day(mock_cache, completed_without_care_plan):
+    data = services.get_order_status(completed_without_care_plan.pk)
+
+    assert 'care_plan_content' not in data
+    assert mock_cache.set.call_args.kwargs['timeout'] == services.IN_PROGRESS_CACHE_TIMEOUT
@@ -5,7 +5,7 @@ from . import views
 
 urlpatterns = [
     # POST /api/orders/                      → 创建新订单
-    # GET  /api/orders/                      → 获取所有订单
+    # GET  /api/orders/                      → 获取订单列表（分页）
     # GET  /api/orders/?search=jane          → 搜索订单
     path('orders/', views.OrderListCreate.as_view(), name='order-list-create'),
 
@@ -5,27 +5,42 @@ Controller 层（views.py）
 只负责：接收 HTTP 请求 → 调 serializer 校验 → 调 service 处理 → 返回 HTTP 响应
 不做任何业务逻辑（不直接操作数据库、不调 LLM、不知道 Redis/Celery 的存在）
 """
-from django.http import HttpResponse
+from django.http import StreamingHttpResponse
 from django.db.models import Q
 from rest_framework import generics, status
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
-from .models import Order
-from .serializers import OrderSerializer
+from .models import Order, Patient
+from .serializers import OrderSerializer, OrderListSerializer, OrderDetailSerializer
 from . import services
 
 
 class OrderListCreate(generics.ListCreateAPIView):
     """
-    GET  /api/orders/              → 返回所有订单
+    GET  /api/orders/              → 返回订单列表（分页，每页 50 条，?page=2 翻页）
     GET  /api/orders/?search=jane  → 搜索订单（按姓名、MRN、药名）
     POST /api/orders/              → 创建新订单
     """
     serializer_class = OrderSerializer
 
+    # 列表不需要的大字段：不从 Postgres 拉（care plan 正文也一样，详情接口再取）
+    DEFERRED_COLUMNS = (
+        'patient_records', 'additional_diagnoses', 'medication_history',
+        'care_plan__content',
+    )
+
+    def get_serializer_class(self):
+        if self.request.method == 'GET':
+            return OrderListSerializer
+        return OrderSerializer
+
     def get_queryset(self):
-        queryset = Order.objects.all().order_by('-created_at')
+        queryset = (
+            OrderListSerializer.setup_eager_loading(Order.objects.all())
+            .defer(*self.DEFERRED_COLUMNS)
+            .order_by('-created_at')
+        )
 
         # 优先处理 order_id（匹配 Lambda 的单接口参数名）
         order_id = self.request.query_params.get('order_id', '').strip()
@@ -40,11 +55,15 @@ class OrderListCreate(generics.ListCreateAPIView):
         # 保持对旧 search 参数的支持
         search = self.request.query_params.get('search', '').strip()
         if search:
+            # 患者三列的 OR 先在 patient 表里做完（三个 trigram 索引 BitmapOr），
+            # 再和药名 OR；四列直接跨 JOIN OR 在一起，planner 只能逐行过滤
+            patients = Patient.objects.filter(
+                Q(first_name__icontains=search) |
+                Q(last_name__icontains=search) |
+                Q(mrn__icontains=search)
+            ).values('pk')
             queryset = queryset.filter(
-                Q(patient__first_name__icontains=search) |
-                Q(patient__last_name__icontains=search) |
-                Q(patient__mrn__icontains=search) |
-                Q(medication_name__icontains=search)
+                Q(patient__in=patients) | Q(medication_name__icontains=search)
             )
 
         return queryset
@@ -60,14 +79,14 @@ class OrderListCreate(generics.ListCreateAPIView):
         # 进而触发 services.create_order()，遇到任何校验失败都会抛出异常，被全局异常处理器捕获
         order = serializer.save(status='pending')
         
-        services.submit_care_plan_task(order.id)
+        services.submit_care_plan_task(order)
         result_serializer = self.get_serializer(order)
         return Response(result_serializer.data, status=status.HTTP_202_ACCEPTED)
 
 class OrderDetail(generics.RetrieveAPIView):
     """GET /api/orders/{id}/ → 单个订单详情"""
-    queryset = Order.objects.all()
-    serializer_class = OrderSerializer
+    queryset = OrderDetailSerializer.setup_eager_loading(Order.objects.all())
+    serializer_class = OrderDetailSerializer
 
 
 class OrderStatusView(APIView):
@@ -94,11 +113,11 @@ class CarePlanDownload(APIView):
     """GET /api/orders/{id}/careplan/download → 下载 Care Plan 为 .txt 文件"""
 
     def get(self, request, pk):
-        file_content, filename = services.build_care_plan_file(pk)
-        if file_content is None:
+        file_chunks, filename = services.build_care_plan_file(pk)
+        if file_chunks is None:
             return Response({'error': filename}, status=status.HTTP_404_NOT_FOUND)
 
-        response = HttpResponse(file_content, content_type='text/plain; charset=utf-8')
+        response = StreamingHttpResponse(file_chunks, content_type='text/plain; charset=utf-8')
         response['Content-Disposition'] = f'attachment; filename="{filename}"'
         return response
 
@@ -122,11 +141,9 @@ class ExternalIntakeView(APIView):
         try:
             # 1. adapter 转换
             adapter = get_adapter(source)
-            if source in ("pharmacorp", "nordic"):
-                raw = request.body
-            else:
-                raw = request.data
-            internal_order = adapter.process(raw)
+            # 所有来源都直接交原始 body：JSON 来源由 adapter 用 orjson 解码，
+            # 不再先让 DRF 的 JSONParser（标准库 json）解析一遍
+            internal_order = adapter.process(request.body)
             
             # 2. 过 serializer 验证（MRN 6位、NPI 10位等）
             serializer = OrderSerializer(
@@ -139,7 +156,7 @@ class ExternalIntakeView(APIView):
             order = serializer.save(status='pending')
 
             # 4. 触发异步任务（你之前漏掉的）
-            services.submit_care_plan_task(order.id)
+            services.submit_care_plan_task(order)
             
             return Response({
                 "message": f"Order created via {source}", 
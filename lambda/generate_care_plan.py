@@ -3,8 +3,9 @@
 # 职责：从 SQS 接收 order_id → 查 RDS 获取订单详情 → 调 Gemini 生成 care plan
 #       → 把结果写回 RDS（orders_careplan 表）→ 更新 order.status
 #
-# 触发方式：SQS 自动触发（每收到一条消息就调用一次 lambda_handler）
-# 重试策略：Gemini 失败最多重试 3 次（指数退避），全部失败后订单状态变为 failed
+# 触发方式：SQS 自动触发（一批最多 10 条消息调用一次 lambda_handler，整批一次查库）
+# 重试策略：Gemini 限流 / 5xx / 网络错误最多试 2 次（带随机抖动的指数退避），
+#           4xx 之类重试也没用的直接失败；失败后订单状态变为 failed，再交给 SQS 重投
 #
 # 环境变量：
 #   DB_HOST, DB_NAME, DB_USER, DB_PASSWORD, DB_PORT
@@ -12,227 +13,303 @@
 
 import json
 import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 from google import genai
-from google.genai import types
+from google.genai import errors, types
 import psycopg2
+from psycopg2.extras import RealDictCursor
 
 
 # ============================================================
 # 数据库连接
 # ============================================================
 
+# 模块级变量在 warm 的 Lambda 容器里会保留：连接只在冷启动时建一次，
+# 之后每条 SQS 消息直接复用，省掉每次 TCP + TLS + 认证的握手
+_CONN = None
+
+
 def get_db_connection():
-    return psycopg2.connect(
-        host=os.environ['DB_HOST'],
-        database=os.environ['DB_NAME'],
-        user=os.environ['DB_USER'],
-        password=os.environ['DB_PASSWORD'],
-        port=os.environ.get('DB_PORT', 5432)
-    )
+    global _CONN
+    if _CONN is None or _CONN.closed:
+        conn = psycopg2.connect(
+            host=os.environ['DB_HOST'],
+            database=os.environ['DB_NAME'],
+            user=os.environ['DB_USER'],
+            password=os.environ['DB_PASSWORD'],
+            port=os.environ.get('DB_PORT', 5432),
+            # 容器冻结 / NAT 空闲超时可能悄悄断开 socket，开 TCP keepalive 尽早发现
+            keepalives=1,
+            keepalives_idle=30,
+            keepalives_interval=10,
+        )
+        # PREPARE 成功了才缓存，不会留下一个没 prepare 过的连接
+        prepare_statements(conn)
+        _CONN = conn
+    return _CONN
+
+
+def reset_db_connection():
+    """复用的连接已经断了（RDS 重启、空闲被回收）：丢掉它，下次 get_db_connection 重连"""
+    global _CONN
+    if _CONN is not None:
+        try:
+            _CONN.close()
+        except Exception:
+            pass
+    _CONN = None
 
 
 # ============================================================
 # 数据库操作
 # ============================================================
 
-def get_order_details(cursor, order_id):
-    """
-    查询订单完整信息（JOIN patient 和 provider）
-    返回一个 dict，字段名和 base.py 里 prompt 用到的一致
-    """
-    cursor.execute("""
+# 热路径上的语句在每个连接上 PREPARE 一次（get_db_connection 建连时），
+# 之后每次只 EXECUTE：Postgres 不用再逐次 parse + plan 这个三表 JOIN
+# 连接在 warm 调用之间复用，所以 PREPARE 的成本只在冷启动 / 重连时付一次
+PREPARED_STATEMENTS = {
+    "get_orders": """
+        PREPARE get_orders(bigint[]) AS
         SELECT
             o.id,
             o.medication_name,
             o.primary_diagnosis,
-            o.additional_diagnoses,
-            o.medication_history,
-            o.patient_records,
-            o.status,
-            p.first_name,
-            p.last_name,
-            p.mrn,
-            p.dob,
-            pr.name AS provider_name,
-            pr.npi  AS provider_npi
+            COALESCE(o.additional_diagnoses, '{}') AS additional_diagnoses,
+            COALESCE(o.medication_history, '{}')   AS medication_history,
+            COALESCE(o.patient_records, '')        AS patient_records,
+            p.first_name AS patient_first_name,
+            p.last_name  AS patient_last_name,
+            p.mrn        AS patient_mrn,
+            p.dob::text  AS patient_dob,
+            pr.name      AS provider_name,
+            pr.npi       AS provider_npi
         FROM orders_order o
         JOIN orders_patient  p  ON o.patient_id  = p.id
         JOIN orders_provider pr ON o.provider_id = pr.id
-        WHERE o.id = %s
-    """, (order_id,))
-
-    row = cursor.fetchone()
-    if not row:
-        return None
-
-    return {
-        "id":                  row[0],
-        "medication_name":     row[1],
-        "primary_diagnosis":   row[2],
-        "additional_diagnoses": row[3] or [],   # jsonb → Python list
-        "medication_history":  row[4] or [],
-        "patient_records":     row[5] or "",
-        "status":              row[6],
-        "patient_first_name":  row[7],
-        "patient_last_name":   row[8],
-        "patient_mrn":         row[9],
-        "patient_dob":         str(row[10]),
-        "provider_name":       row[11],
-        "provider_npi":        row[12],
-    }
-
-
-def set_order_status(cursor, order_id, status):
-    cursor.execute(
-        "UPDATE orders_order SET status = %s WHERE id = %s",
-        (status, order_id)
-    )
+        WHERE o.id = ANY($1)
+          AND o.status NOT IN ('completed', 'processing')
+        FOR UPDATE OF o SKIP LOCKED
+    """,
+    "set_orders_status": """
+        PREPARE set_orders_status(text, bigint[]) AS
+        UPDATE orders_order SET status = $1 WHERE id = ANY($2)
+    """,
+    "save_care_plans": """
+        PREPARE save_care_plans(bigint[], text[]) AS
+        WITH saved AS (
+            INSERT INTO orders_careplan (order_id, content, created_at)
+            SELECT order_id, content, NOW() FROM unnest($1, $2) AS t(order_id, content)
+            ON CONFLICT (order_id) DO UPDATE SET content = EXCLUDED.content
+            RETURNING order_id
+        )
+        UPDATE orders_order SET status = 'completed'
+        WHERE id IN (SELECT order_id FROM saved)
+    """,
+}
+
+
+def prepare_statements(conn):
+    with conn:
+        with conn.cursor() as cursor:
+            for sql in PREPARED_STATEMENTS.values():
+                cursor.execute(sql)
+
+
+def get_orders_details(cursor, order_ids):
+    """
+    一次查出一批订单的完整信息（JOIN patient 和 provider）
+    SQS 一批最多 10 条消息：一条 SELECT ... = ANY(...) 代替逐条查询，N 次往返变 1 次
+    cursor 是 RealDictCursor：SQL 里的别名就是 base.py 里 prompt 用到的字段名，每行直接是 dict
+    已经 completed / processing 的在 SQL 里就过滤掉（SQS 重投时不用把 patient_records 这些大字段拉回来）；
+    FOR UPDATE SKIP LOCKED 只管 claim 这一个事务：两个 Lambda 同时 claim 同一个订单时，后来的直接跳过。
+    claim 事务提交后锁就放掉了，调 Gemini 期间靠 status = 'processing' 挡住重投的消息
+    返回 {order_id: dict}；不存在 / 已完成 / 正在处理 / 被别人锁住的 id 不在里面
+    """
+    cursor.execute("EXECUTE get_orders(%s)", (list(order_ids),))   # Python list → PG 数组
+
+    return {row["id"]: row for row in cursor.fetchall()}
+
 
+def set_orders_status(cursor, order_ids, status):
+    cursor.execute("EXECUTE set_orders_status(%s, %s)", (status, list(order_ids)))
 
-def save_care_plan(cursor, order_id, content):
+
+def save_care_plans(cursor, contents):
     """
-    INSERT INTO orders_careplan
-    如果已存在（因为重试）用 ON CONFLICT 更新内容
+    INSERT INTO orders_careplan（如果已存在，因为重试，用 ON CONFLICT 更新内容）
+    并把 order.status 改成 completed
+    整批用 unnest 两个数组展开成行，写成一条带 CTE 的语句：一次往返，天然原子
+    contents: {order_id: content}
     """
-    cursor.execute("""
-        INSERT INTO orders_careplan (order_id, content, created_at)
-        VALUES (%s, %s, NOW())
-        ON CONFLICT (order_id) DO UPDATE SET content = EXCLUDED.content
-    """, (order_id, content))
+    order_ids = list(contents)
+    cursor.execute(
+        "EXECUTE save_care_plans(%s, %s)",
+        (order_ids, [contents[order_id] for order_id in order_ids]),
+    )
 
 
 # ============================================================
 # Gemini 调用（直接从 base.py 移植 prompt 逻辑）
 # ============================================================
 
+# 固定的指令部分：和 backend/orders/LLMServices/base.py 的 CARE_PLAN_SYSTEM_PROMPT 一致，
+# 作为 system instruction 单独传，每次请求逐字节相同，能命中 provider 侧的前缀缓存
+CARE_PLAN_SYSTEM_PROMPT = """You are a clinical pharmacist creating a care plan for a specialty pharmacy patient.
+
+Please generate a comprehensive pharmaceutical care plan with EXACTLY these four sections:
+
+1. **Problem List / Drug Therapy Problems (DTPs)**
+- Identify potential drug therapy problems related to the prescribed medication and diagnoses
+
+2. **Goals (SMART format)**
+- Specific, Measurable, Achievable, Relevant, Time-bound goals for this patient
+
+3. **Pharmacist Interventions / Plan**
+- Specific actions the pharmacist should take
+- Patient education points
+- Coordination with the prescribing provider
+
+4. **Monitoring Plan & Lab Schedule**
+- Labs to monitor and frequency
+- Clinical parameters to track
+- Follow-up schedule
+
+Be specific and clinically relevant to the medication and diagnoses provided."""
+
+# 每次请求的 config 都一样，模块加载时建一次
+_GENERATE_CONFIG = types.GenerateContentConfig(system_instruction=CARE_PLAN_SYSTEM_PROMPT)
+
+
 def build_prompt(order):
     """
-    与 backend/orders/LLMServices/base.py 中的 _build_prompt 保持完全一致
+    只拼动态的患者部分，和 backend/orders/LLMServices/base.py 中的 build_care_plan_prompt 保持一致；
+    固定指令在 CARE_PLAN_SYSTEM_PROMPT 里，由 call_gemini 作为 system instruction 传
     """
     additional = ', '.join(order["additional_diagnoses"]) if order["additional_diagnoses"] else 'None'
     history    = ', '.join(order["medication_history"])   if order["medication_history"]   else 'None'
     records    = order["patient_records"] if order["patient_records"] else 'None provided'
 
-    return f"""You are a clinical pharmacist creating a care plan for a specialty pharmacy patient.
-
-    Patient Information:
-    - Name: {order["patient_first_name"]} {order["patient_last_name"]}
-    - Date of Birth: {order["patient_dob"]}
-    - MRN: {order["patient_mrn"]}
+    return f"""Patient Information:
+- Name: {order["patient_first_name"]} {order["patient_last_name"]}
+- Date of Birth: {order["patient_dob"]}
+- MRN: {order["patient_mrn"]}
 
-    Provider: {order["provider_name"]} (NPI: {order["provider_npi"]})
+Provider: {order["provider_name"]} (NPI: {order["provider_npi"]})
 
-    Medication: {order["medication_name"]}
-    Primary Diagnosis (ICD-10): {order["primary_diagnosis"]}
-    Additional Diagnoses: {additional}
-    Medication History: {history}
-    Patient Records/Notes: {records}
+Medication: {order["medication_name"]}
+Primary Diagnosis (ICD-10): {order["primary_diagnosis"]}
+Additional Diagnoses: {additional}
+Medication History: {history}
+Patient Records/Notes: {records}"""
 
-    Please generate a comprehensive pharmaceutical care plan with EXACTLY these four sections:
 
-    1. **Problem List / Drug Therapy Problems (DTPs)**
-    - Identify potential drug therapy problems related to the prescribed medication and diagnoses
+# 和 _CONN 一样放在模块级：Client 只在冷启动后第一次调用时建，
+# warm 调用复用它（以及它底下的 HTTPS 连接池），不用每次重新握手
+_GENAI_CLIENT = None
+_GENAI_CLIENT_LOCK = threading.Lock()
 
-    2. **Goals (SMART format)**
-    - Specific, Measurable, Achievable, Relevant, Time-bound goals for this patient
 
-    3. **Pharmacist Interventions / Plan**
-    - Specific actions the pharmacist should take
-    - Patient education points
-    - Coordination with the prescribing provider
+def get_genai_client():
+    global _GENAI_CLIENT
+    # 一批订单在线程池里并发调 Gemini，加锁保证只建一个 Client
+    with _GENAI_CLIENT_LOCK:
+        if _GENAI_CLIENT is None:
+            _GENAI_CLIENT = genai.Client(api_key=os.environ['GOOGLE_API_KEY'])
+        return _GENAI_CLIENT
 
-    4. **Monitoring Plan & Lab Schedule**
-    - Labs to monitor and frequency
-    - Clinical parameters to track
-    - Follow-up schedule
 
-    Be specific and clinically relevant to the medication and diagnoses provided."""
+def is_retryable(e):
+    """
+    429 限流、5xx 服务端错误值得重试；其他 4xx（key 无效、没权限、请求本身有问题）重试也一样失败
+    不是 APIError 的（超时、连接断开这类网络错误）也重试
+    """
+    if isinstance(e, errors.APIError):
+        return e.code == 429 or e.code >= 500
+    return True
 
 
-def call_gemini(prompt, max_retries=3):
+def call_gemini(prompt, max_retries=2):
     """
-    调 Gemini API，最多重试 max_retries 次（指数退避）。
-    成功返回 content 字符串，全部失败抛 RuntimeError。
+    调 Gemini API，可重试的错误最多试 max_retries 次（带抖动的指数退避）。
+    SQS 本身还会通过 batchItemFailures 重投，这里不用试太多次。
+    成功返回 content 字符串，失败抛 RuntimeError。
     """
-    import time
-
-    client = genai.Client(api_key=os.environ['GOOGLE_API_KEY'])
+    client = get_genai_client()
 
     for attempt in range(1, max_retries + 1):
         try:
             response = client.models.generate_content(
                 model='gemini-flash-latest',
-                contents=prompt
+                contents=prompt,
+                config=_GENERATE_CONFIG,
             )
             return response.text
         except Exception as e:
             print(f"[Gemini] Attempt {attempt}/{max_retries} failed: {e}")
+            if not is_retryable(e):
+                raise RuntimeError(f"Gemini failed with non-retryable error: {e}")
             if attempt < max_retries:
-                time.sleep(2 ** attempt)   # 2s, 4s, 8s 退避
+                # full jitter：同时失败的多个 Lambda 不会在同一时刻一起重试
+                time.sleep(random.uniform(0, 2 ** attempt))
             else:
                 raise RuntimeError(f"Gemini failed after {max_retries} attempts: {e}")
 
 
+def generate_content(order):
+    """build_prompt + call_gemini：在线程池里跑，异常由 future.result() 带回主线程"""
+    return call_gemini(build_prompt(order))
+
+
 # ============================================================
-# Lambda 核心处理逻辑（处理单条订单）
+# Lambda 核心处理逻辑（整批 claim，整批写回）
 # ============================================================
 
-def process_order(order_id):
+def claim_orders(conn, order_ids):
     """
-    完整处理一个订单：
-    1. 查 RDS 取订单详情
-    2. status → processing
-    3. 调 Gemini 生成 care plan
-    4. 写回 orders_careplan 表
-    5. status → completed
-    遇到任何异常直接抛出，让上层决定是报错还是标 failed
+    1. 一次查 RDS 取这批订单的详情
+    2. 要处理的订单 status → processing（一条 UPDATE）
+    一个事务里完成；返回 {order_id: order}，不存在 / 已经 completed / 正在 processing 的不在里面
+    （failed 的订单可以被重投的消息重新 claim）
     """
-    conn = get_db_connection()
-    try:
-        with conn:
-            with conn.cursor() as cursor:
-                # 1. 查订单
-                order = get_order_details(cursor, order_id)
-                if not order:
-                    print(f"[WARN] Order {order_id} not found, skipping")
-                    return
-
-                # 已经处理过的订单跳过（防止重复消费）
-                if order["status"] == "completed":
-                    print(f"[INFO] Order {order_id} already completed, skipping")
-                    return
+    with conn:
+        with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+            # 已经处理过 / 正在处理的订单在查询里就跳过了（防止重复消费）
+            orders = get_orders_details(cursor, order_ids)
+            for order_id in order_ids:
+                if order_id not in orders:
+                    print(f"[INFO] Order {order_id} not found, already completed or being processed, skipping")
 
-                # 2. 更新状态为 processing
-                set_order_status(cursor, order_id, "processing")
+            if orders:
+                set_orders_status(cursor, orders, "processing")
+    return orders
 
-        # ← 事务这里 commit（processing 状态先写进去）
 
-        # 3. 调 Gemini（在事务外，因为网络调用可能很慢）
-        prompt  = build_prompt(order)
-        content = call_gemini(prompt)
-
-        # 4+5. 写 care plan + 更新状态为 completed（同一个事务，原子）
-        with conn:
-            with conn.cursor() as cursor:
-                save_care_plan(cursor, order_id, content)
-                set_order_status(cursor, order_id, "completed")
+def complete_orders(conn, contents):
+    """
+    4. 写回 orders_careplan 表
+    5. status → completed
+    整批成功的订单一条语句完成（原来是每个订单一条）
+    """
+    with conn:
+        with conn.cursor() as cursor:
+            save_care_plans(cursor, contents)
 
+    for order_id in contents:
         print(f"[OK] Order {order_id} care plan generated successfully")
 
-    except Exception as e:
-        # 出错 → 标记为 failed
-        print(f"[ERROR] Order {order_id} failed: {e}")
-        try:
-            with conn:
-                with conn.cursor() as cursor:
-                    set_order_status(cursor, order_id, "failed")
-        except Exception as db_err:
-            print(f"[ERROR] Could not update status to failed: {db_err}")
-        raise   # 重新抛出，让 SQS 知道这条消息处理失败（会进死信队列）
 
-    finally:
-        conn.close()
+def fail_orders(conn, order_ids):
+    """出错的订单一条 UPDATE 标记为 failed（标记本身失败只打日志）"""
+    try:
+        with conn:
+            with conn.cursor() as cursor:
+                set_orders_status(cursor, order_ids, "failed")
+    except Exception as db_err:
+        print(f"[ERROR] Could not update status to failed for {list(order_ids)}: {db_err}")
 
 
 # ============================================================
@@ -243,24 +320,88 @@ def lambda_handler(event, context):
     """
     SQS 触发时，event["Records"] 是一个列表（batch）。
     每条 Record 的 body 是 post_orders 发出的 JSON：{"order_id": 123}
-    
+
+    先把整批 order_id 解析出来，一次查库 claim，再并发调 Gemini，最后整批写回
+
     失败处理策略：
     - 某一条失败时，把它的 messageId 加入 batchItemFailures
     - SQS 只会重新投递失败的那条，成功的不会重试
     """
     failures = []
+    messages = []   # [(messageId, order_id)]
 
     for record in event.get("Records", []):
         message_id = record["messageId"]
         try:
-            body     = json.loads(record["body"])
-            order_id = body["order_id"]
-            print(f"[START] Processing order_id={order_id} (messageId={message_id})")
-            process_order(order_id)
-
+            body = json.loads(record["body"])
+            messages.append((message_id, int(body["order_id"])))
         except Exception as e:
             print(f"[FAIL] messageId={message_id} error: {e}")
             failures.append({"itemIdentifier": message_id})
 
+    if not messages:
+        return {"batchItemFailures": failures}
+
+    order_ids = [order_id for _, order_id in messages]
+    print(f"[START] Processing order_ids={order_ids}")
+    try:
+        conn = get_db_connection()
+        try:
+            orders = claim_orders(conn, order_ids)
+        except (psycopg2.OperationalError, psycopg2.InterfaceError) as e:
+            # 复用的连接第一次用就失败，多半是 warm 期间被断开了：重连一次再试
+            # （断开后 with conn 退出时的 rollback 会再抛 InterfaceError，两种都算）
+            print(f"[WARN] Stale DB connection, reconnecting: {e}")
+            reset_db_connection()
+            conn = get_db_connection()
+            orders = claim_orders(conn, order_ids)
+    except Exception as e:
+        # 连查库都失败了：整批都报失败，让 SQS 重投
+        print(f"[FAIL] Could not claim orders {order_ids}: {e}")
+        failures.extend({"itemIdentifier": message_id} for message_id, _ in messages)
+        return {"batchItemFailures": failures}
+
+    # 同一批里重复投递的同一个订单只处理一次
+    todo = []   # [(messageId, order)]
+    for message_id, order_id in messages:
+        order = orders.pop(order_id, None)
+        if order is not None:
+            todo.append((message_id, order))
+    if not todo:
+        return {"batchItemFailures": failures}
+
+    # 3. 调 Gemini：纯网络 I/O（等待时释放 GIL），整批并发发出去，总耗时约等于最慢的那一个
+    #    线程里只调 Gemini，写库都回到主线程做，连接不会被多个线程同时用
+    done = {}     # {order_id: (messageId, content)}
+    failed = {}   # {order_id: messageId}
+    with ThreadPoolExecutor(max_workers=len(todo)) as pool:
+        futures = {
+            pool.submit(generate_content, order): (message_id, order["id"])
+            for message_id, order in todo
+        }
+        for future in as_completed(futures):
+            message_id, order_id = futures[future]
+            try:
+                done[order_id] = (message_id, future.result())
+            except Exception as e:
+                print(f"[ERROR] Order {order_id} failed: {e}")
+                failed[order_id] = message_id
+
+    # 4/5. 整批写回：成功的一条语句存 care plan + completed，失败的一条 UPDATE 标 failed
+    #      N 个订单 N 次往返 → 最多 2 次
+    if done:
+        try:
+            complete_orders(conn, {order_id: content for order_id, (_, content) in done.items()})
+        except Exception as e:
+            print(f"[ERROR] Could not save care plans for {list(done)}: {e}")
+            failed.update({order_id: message_id for order_id, (message_id, _) in done.items()})
+
+    if failed:
+        fail_orders(conn, failed)
+        for order_id, message_id in failed.items():
+            # 让 SQS 只重投这一条（会进死信队列）
+            print(f"[FAIL] messageId={message_id} order_id={order_id}")
+            failures.append({"itemIdentifier": message_id})
+
     # 返回失败列表（空列表 = 全部成功）
     return {"batchItemFailures": failures}
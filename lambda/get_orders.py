@@ -1,21 +1,93 @@
 # lambda/get_orders.py
-import json
+import logging
+import orjson
 import psycopg2
 from psycopg2.extras import RealDictCursor
 import os
 
+# Lambda 运行时已经在 root logger 上挂好了 handler，这里只设级别；参数用 %s 懒格式化
+log = logging.getLogger()
+log.setLevel(logging.INFO)
+
+# 模块级变量在 warm 的 Lambda 容器里会保留：连接只在冷启动时建一次，
+# 之后每个请求直接复用，省掉每次 TCP + TLS + 认证的握手
+_CONN = None
+
+
 def get_db_connection():
-    return psycopg2.connect(
-        host=os.environ['DB_HOST'],
-        database=os.environ['DB_NAME'],
-        user=os.environ['DB_USER'],
-        password=os.environ['DB_PASSWORD'],
-        port=os.environ.get('DB_PORT', '5432'),
-        connect_timeout=5
-    )
+    global _CONN
+    if _CONN is None or _CONN.closed:
+        conn = psycopg2.connect(
+            host=os.environ['DB_HOST'],
+            database=os.environ['DB_NAME'],
+            user=os.environ['DB_USER'],
+            password=os.environ['DB_PASSWORD'],
+            port=os.environ.get('DB_PORT', '5432'),
+            connect_timeout=5,
+            # 容器冻结 / NAT 空闲超时可能悄悄断开 socket，开 TCP keepalive 尽早发现
+            keepalives=1,
+            keepalives_idle=30,
+            keepalives_interval=10,
+        )
+        # 这里只有只读查询：autocommit 下不会开事务，连接在两次调用之间不会停在 idle in transaction
+        conn.autocommit = True
+        # PREPARE 成功了才缓存，不会留下一个没 prepare 过的连接
+        prepare_statements(conn)
+        _CONN = conn
+    return _CONN
+
+
+def reset_db_connection():
+    """复用的连接已经断了（RDS 重启、空闲被回收）：丢掉它，下次 get_db_connection 重连"""
+    global _CONN
+    if _CONN is not None:
+        try:
+            _CONN.close()
+        except Exception:
+            pass
+    _CONN = None
+
+
+# 查询在每个连接上 PREPARE 一次（get_db_connection 建连时），之后每次只 EXECUTE：
+# Postgres 不用再逐次 parse + plan 这个四表 JOIN；连接在 warm 调用之间复用，PREPARE 只在冷启动 / 重连时付一次
+# 智能化查询：如果 order_id 是数字，匹配 ID；同时也按 MRN 匹配（MRN 也是数字）
+# 不再用 o.id::text = %s（每行都要转 text，主键索引用不上）：
+# - 数字才去比 o.id，按 bigint 传参，走主键索引
+# - MRN 是 unique 的，先子查询出 patient_id 再比 o.patient_id，两边都能走索引（BitmapOr）
+PREPARED_STATEMENTS = {
+    "get_orders": """
+        PREPARE get_orders(bigint, text) AS
+        SELECT 
+            o.id as order_id, o.status, o.created_at,
+            p.first_name || ' ' || p.last_name as patient_name,
+            p.mrn,
+            pr.name as provider_name,
+            cp.content as care_plan
+        FROM orders_order o
+        JOIN orders_patient p ON o.patient_id = p.id
+        JOIN orders_provider pr ON o.provider_id = pr.id
+        LEFT JOIN orders_careplan cp ON o.id = cp.order_id
+        WHERE o.id = $1
+           OR o.patient_id = (SELECT id FROM orders_patient WHERE mrn = $2)
+        ORDER BY o.created_at DESC
+    """,
+}
+
+
+def prepare_statements(conn):
+    with conn.cursor() as cursor:
+        for sql in PREPARED_STATEMENTS.values():
+            cursor.execute(sql)
+
+
+def fetch_orders(order_id):
+    order_pk = int(order_id) if order_id.isdigit() and len(order_id) <= 18 else None
+    with get_db_connection().cursor(cursor_factory=RealDictCursor) as cur:
+        cur.execute("EXECUTE get_orders(%s, %s)", (order_pk, order_id))
+        return cur.fetchall()
 
 def lambda_handler(event, context):
-    print(f"Received event: {json.dumps(event)}")
+    log.info("Received event: %s", event)
     
     # 允许 API Gateway 的 query string 参数
     order_id = event.get('queryStringParameters', {}).get('order_id')
@@ -23,31 +95,18 @@ def lambda_handler(event, context):
     if not order_id:
         return {
             'statusCode': 400,
-            'body': json.dumps({'message': 'order_id or MRN is required'})
+            'body': orjson.dumps({'message': 'order_id or MRN is required'}).decode()
         }
 
     try:
-        conn = get_db_connection()
-        cur = conn.cursor(cursor_factory=RealDictCursor)
-        
-        # 智能化查询：如果 order_id 是数字，匹配 ID；如果不是，匹配 MRN
-        query = """
-            SELECT 
-                o.id as order_id, o.status, o.created_at,
-                p.first_name || ' ' || p.last_name as patient_name,
-                p.mrn,
-                pr.name as provider_name,
-                cp.content as care_plan
-            FROM orders_order o
-            JOIN orders_patient p ON o.patient_id = p.id
-            JOIN orders_provider pr ON o.provider_id = pr.id
-            LEFT JOIN orders_careplan cp ON o.id = cp.order_id
-            WHERE (o.id::text = %s OR p.mrn = %s)
-            ORDER BY o.created_at DESC
-        """
-        cur.execute(query, (order_id, order_id))
-        results = cur.fetchall()
-        
+        try:
+            results = fetch_orders(order_id)
+        except (psycopg2.OperationalError, psycopg2.InterfaceError) as e:
+            # 复用的连接第一次用就失败，多半是 warm 期间被断开了：重连一次再试
+            log.warning("[WARN] Stale DB connection, reconnecting: %s", e)
+            reset_db_connection()
+            results = fetch_orders(order_id)
+
         # 返回列表，兼容前端的 Table 渲染
         return {
             'statusCode': 200,
@@ -55,19 +114,20 @@ def lambda_handler(event, context):
                 'Access-Control-Allow-Origin': '*',
                 'Content-Type': 'application/json'
             },
-            'body': json.dumps(results, default=str)
+            # care_plan 是很长的文本，用 orjson（Rust 实现）序列化；API Gateway 要 str 所以 decode
+            # datetime 交给 default=str，格式和原来 json.dumps(default=str) 一样
+            'body': orjson.dumps(
+                results, default=str, option=orjson.OPT_PASSTHROUGH_DATETIME
+            ).decode()
         }
 
     except Exception as e:
-        print(f"ERROR: {str(e)}")
+        log.error("ERROR: %s", e)
         return {
             'statusCode': 500,
             'headers': {
                 'Access-Control-Allow-Origin': '*',
                 'Content-Type': 'application/json'
             },
-            'body': json.dumps({'error': str(e)})
-        }
-    finally:
-        if 'conn' in locals():
-            conn.close()
\ No newline at end of file
+            'body': orjson.dumps({'error': str(e)}).decode()
+        }
\ No newline at end of file
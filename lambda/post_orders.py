@@ -21,30 +21,64 @@
 #   "medication_history": [],       # 可选，默认 []
 #   "patient_records": ""           # 可选，默认 ""
 # }
+# 批量下单：body 也可以是上面这种对象的列表，整批一个事务写入，SQS 每 10 条一个请求发出去
+# 返回 {"message": "Orders accepted", "order_ids": [...], "status": "pending"}
 
-import json
+import base64
+import binascii
+import logging
 import os
-import re
-from datetime import date, datetime
+from datetime import date
 
 import boto3
+import orjson
 import psycopg2
-import psycopg2.extras  # 让 cursor 返回 dict 而不是 tuple
+
+# Lambda 运行时已经在 root logger 上挂好了 handler（每行自动带 request id），这里只设级别
+# 参数用 %s 懒格式化：级别关掉时不会拼字符串
+log = logging.getLogger()
+log.setLevel(logging.INFO)
 
 
 # ============================================================
 # 工具函数
 # ============================================================
 
+# 模块级变量在 warm 的 Lambda 容器里会保留：连接只在冷启动时建一次，
+# 之后每个请求直接复用，省掉每次 TCP + TLS + 认证的握手
+_CONN = None
+
+
 def get_db_connection():
-    """从环境变量读取数据库配置"""
-    return psycopg2.connect(
-        host=os.environ['DB_HOST'],
-        database=os.environ['DB_NAME'],
-        user=os.environ['DB_USER'],
-        password=os.environ['DB_PASSWORD'],
-        port=os.environ.get('DB_PORT', 5432)
-    )
+    """从环境变量读取数据库配置；warm 调用复用同一个连接"""
+    global _CONN
+    if _CONN is None or _CONN.closed:
+        conn = psycopg2.connect(
+            host=os.environ['DB_HOST'],
+            database=os.environ['DB_NAME'],
+            user=os.environ['DB_USER'],
+            password=os.environ['DB_PASSWORD'],
+            port=os.environ.get('DB_PORT', 5432),
+            # 容器冻结 / NAT 空闲超时可能悄悄断开 socket，开 TCP keepalive 尽早发现
+            keepalives=1,
+            keepalives_idle=30,
+            keepalives_interval=10,
+        )
+        # PREPARE 成功了才缓存，不会留下一个没 prepare 过的连接
+        prepare_statements(conn)
+        _CONN = conn
+    return _CONN
+
+
+def reset_db_connection():
+    """复用的连接已经断了（RDS 重启、空闲被回收）：丢掉它，下次 get_db_connection 重连"""
+    global _CONN
+    if _CONN is not None:
+        try:
+            _CONN.close()
+        except Exception:
+            pass
+    _CONN = None
 
 
 def response(status_code, body):
@@ -52,7 +86,7 @@ def response(status_code, body):
     return {
         "statusCode": status_code,
         "headers": {"Content-Type": "application/json"},
-        "body": json.dumps(body)
+        "body": orjson.dumps(body).decode()   # orjson 返回 bytes，API Gateway 要 str
     }
 
 
@@ -60,6 +94,25 @@ def response(status_code, body):
 # 输入验证
 # ============================================================
 
+# 每个 POST 都要验证：全是定长格式，直接 len + isdecimal()（和 \d 匹配的字符集一样），不用正则
+# MRN / NPI 是定长纯数字；DOB 见 _is_iso_date_shape
+
+
+def _is_iso_date_shape(value):
+    """是不是 YYYY-MM-DD 的样子（只看形状，日期合不合法交给 date.fromisoformat）"""
+    return (
+        len(value) == 10
+        and value[4] == value[7] == "-"
+        and (value[:4] + value[5:7] + value[8:]).isdecimal()
+    )
+
+
+# 必填字段表：validate_input 按表循环检查，加必填字段只改这里
+_REQUIRED_PATIENT = ("first_name", "last_name", "mrn", "dob")
+_REQUIRED_PROVIDER = ("name", "npi")
+_REQUIRED_ORDER = ("medication_name", "primary_diagnosis")
+
+
 def validate_input(body):
     """
     验证必填字段和格式。
@@ -74,18 +127,20 @@ def validate_input(body):
     if not patient:
         errors.append("'patient' object is required")
     else:
-        for field in ["first_name", "last_name", "mrn", "dob"]:
-            if not patient.get(field):
-                errors.append(f"patient.{field} is required")
+        errors.extend(f"patient.{field} is required" for field in _REQUIRED_PATIENT if not patient.get(field))
 
         mrn = patient.get("mrn", "")
-        if mrn and not re.fullmatch(r"\d{6}", mrn):
+        if mrn and not (len(mrn) == 6 and mrn.isdecimal()):
             errors.append(f"patient.mrn must be exactly 6 digits, got: '{mrn}'")
 
         dob = patient.get("dob", "")
         if dob:
+            # 先卡住 YYYY-MM-DD 格式（fromisoformat 还接受 19900105 这类写法），
+            # date.fromisoformat（C 实现，比 strptime 解析格式串快）检查日期本身合不合法
             try:
-                datetime.strptime(dob, "%Y-%m-%d")
+                if not _is_iso_date_shape(dob):
+                    raise ValueError(dob)
+                date.fromisoformat(dob)
             except ValueError:
                 errors.append(f"patient.dob must be YYYY-MM-DD format, got: '{dob}'")
 
@@ -94,20 +149,14 @@ def validate_input(body):
     if not provider:
         errors.append("'provider' object is required")
     else:
-        for field in ["name", "npi"]:
-            if not provider.get(field):
-                errors.append(f"provider.{field} is required")
+        errors.extend(f"provider.{field} is required" for field in _REQUIRED_PROVIDER if not provider.get(field))
 
         npi = provider.get("npi", "")
-        if npi and not re.fullmatch(r"\d{10}", npi):
+        if npi and not (len(npi) == 10 and npi.isdecimal()):
             errors.append(f"provider.npi must be exactly 10 digits, got: '{npi}'")
 
     # --- Order fields ---
-    if not body.get("medication_name"):
-        errors.append("'medication_name' is required")
-
-    if not body.get("primary_diagnosis"):
-        errors.append("'primary_diagnosis' is required")
+    errors.extend(f"'{field}' is required" for field in _REQUIRED_ORDER if not body.get(field))
 
     if errors:
         return None, errors
@@ -137,65 +186,24 @@ def validate_input(body):
 # 数据库操作
 # ============================================================
 
-def upsert_patient(cursor, patient_data):
-    """
-    按 MRN 查找 Patient，找到就返回 id，找不到就创建。
-    对应 Django services.py 里的 check_patient（简化版，Lambda 不做警告逻辑）
-    """
-    cursor.execute(
-        "SELECT id FROM orders_patient WHERE mrn = %s",
-        (patient_data["mrn"],)
-    )
-    row = cursor.fetchone()
-    if row:
-        return row[0]  # 已存在，直接返回 id
-
-    # 创建新 Patient
-    cursor.execute(
-        """
-        INSERT INTO orders_patient (first_name, last_name, mrn, dob, created_at)
-        VALUES (%s, %s, %s, %s, NOW())
-        RETURNING id
-        """,
-        (
-            patient_data["first_name"],
-            patient_data["last_name"],
-            patient_data["mrn"],
-            patient_data["dob"],
+# 热路径上的语句在每个连接上 PREPARE 一次（get_db_connection 建连时），
+# 之后每次只 EXECUTE：Postgres 不用再逐次 parse + plan
+# 连接在 warm 调用之间复用，所以 PREPARE 的成本只在冷启动 / 重连时付一次
+PREPARED_STATEMENTS = {
+    # 参数：$1-$4 patient, $5-$6 provider, $7-$11 order
+    "insert_order": """
+        PREPARE insert_order(text, text, text, date, text, text, text, text, text[], text[], text) AS
+        WITH p AS (
+            INSERT INTO orders_patient (first_name, last_name, mrn, dob, created_at)
+            VALUES ($1, $2, $3, $4, NOW())
+            ON CONFLICT (mrn) DO UPDATE SET mrn = EXCLUDED.mrn
+            RETURNING id
+        ), pr AS (
+            INSERT INTO orders_provider (name, npi, created_at)
+            VALUES ($5, $6, NOW())
+            ON CONFLICT (npi) DO UPDATE SET npi = EXCLUDED.npi
+            RETURNING id
         )
-    )
-    return cursor.fetchone()[0]
-
-
-def upsert_provider(cursor, provider_data):
-    """
-    按 NPI 查找 Provider，找到就返回 id，找不到就创建。
-    """
-    cursor.execute(
-        "SELECT id FROM orders_provider WHERE npi = %s",
-        (provider_data["npi"],)
-    )
-    row = cursor.fetchone()
-    if row:
-        return row[0]
-
-    cursor.execute(
-        """
-        INSERT INTO orders_provider (name, npi, created_at)
-        VALUES (%s, %s, NOW())
-        RETURNING id
-        """,
-        (provider_data["name"], provider_data["npi"])
-    )
-    return cursor.fetchone()[0]
-
-
-def insert_order(cursor, patient_id, provider_id, data):
-    """
-    插入新订单，status 默认 'pending'。
-    """
-    cursor.execute(
-        """
         INSERT INTO orders_order (
             patient_id, provider_id,
             medication_name, primary_diagnosis,
@@ -203,44 +211,108 @@ def insert_order(cursor, patient_id, provider_id, data):
             patient_records,
             status, order_date, created_at
         )
-        VALUES (%s, %s, %s, %s, %s, %s, %s, 'pending', CURRENT_DATE, NOW())
+        SELECT
+            p.id, pr.id,
+            $7, $8,
+            $9, $10,
+            $11,
+            'pending', CURRENT_DATE, NOW()
+        FROM p, pr
         RETURNING id
-        """,
+    """,
+}
+
+
+def prepare_statements(conn):
+    with conn:
+        with conn.cursor() as cursor:
+            for sql in PREPARED_STATEMENTS.values():
+                cursor.execute(sql)
+
+
+def insert_order(cursor, data):
+    """
+    patient → provider → order 一条语句写完，返回新 order 的 id（status 默认 'pending'）。
+    对应 Django services.py 里的 check_patient / check_provider（简化版，Lambda 不做警告逻辑）：
+    - patient 按 MRN、provider 按 NPI：找到就用已有的 id，找不到就创建
+      INSERT ... ON CONFLICT 一步完成，并发插同一个 MRN / NPI 也不会撞唯一约束；
+      DO UPDATE SET mrn = EXCLUDED.mrn 不改任何值（已存在的记录保持原样），
+      只是为了让 RETURNING 在冲突时也能返回已有行的 id
+    - 两个 upsert 写成 CTE，最后的 INSERT 直接引用它们的 id：三步一次往返，同一条语句天然原子
+    """
+    patient = data["patient"]
+    provider = data["provider"]
+    cursor.execute(
+        "EXECUTE insert_order(%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)",
         (
-            patient_id,
-            provider_id,
+            patient["first_name"], patient["last_name"], patient["mrn"], patient["dob"],
+            provider["name"], provider["npi"],
             data["medication_name"],
             data["primary_diagnosis"],
-            json.dumps(data["additional_diagnoses"]),   # jsonb 列需要序列化
-            json.dumps(data["medication_history"]),
+            data["additional_diagnoses"],   # text[] 列：psycopg2 把 Python list 转成 PG 数组
+            data["medication_history"],
             data["patient_records"],
         )
     )
     return cursor.fetchone()[0]
 
 
+def save_orders(conn, orders):
+    """一个短事务里写入一批订单（单个下单时就是一条）；按顺序返回新 order 的 id 列表"""
+    with conn:                          # with 块结束自动 commit；异常时自动 rollback
+        with conn.cursor() as cursor:
+            return [insert_order(cursor, data) for data in orders]
+
+
 # ============================================================
 # SQS
 # ============================================================
 
+# boto3 建 client 要加载 service model、解析 endpoint，冷启动时建一次，warm 调用直接复用
+_SQS = boto3.client("sqs", region_name=os.environ.get("AWS_REGION", "eu-north-1"))
+
+
 def send_to_sqs(order_id):
     """
     把 order_id 发到 SQS，下游 generate_care_plan Lambda 会消费它。
     SQS_QUEUE_URL 从环境变量读取。
+    消息里只放 order_id：发送时间 SQS 自己会记（SentTimestamp 属性），下游也只读 order_id
     """
-    sqs = boto3.client("sqs", region_name=os.environ.get("AWS_REGION", "eu-north-1"))
     queue_url = os.environ["SQS_QUEUE_URL"]
 
-    message = {
-        "order_id": order_id,
-        "created_at": datetime.utcnow().isoformat()
-    }
-
-    sqs.send_message(
+    _SQS.send_message(
         QueueUrl=queue_url,
-        MessageBody=json.dumps(message)
+        MessageBody=orjson.dumps({"order_id": order_id}).decode()
     )
-    print(f"[SQS] Message sent for order_id={order_id}")
+    log.info("[SQS] Message sent for order_id=%s", order_id)
+
+
+# send_message_batch 一次最多 10 条
+SQS_BATCH_SIZE = 10
+
+
+def send_to_sqs_batch(order_ids):
+    """
+    批量下单时用：每 10 个 order_id 一个 send_message_batch 请求，代替每个订单一次 HTTP 请求。
+    消息内容和 send_to_sqs 一样；某几条发送失败只打日志（订单已经在 DB 里，后续可以补偿）
+    """
+    queue_url = os.environ["SQS_QUEUE_URL"]
+
+    for start in range(0, len(order_ids), SQS_BATCH_SIZE):
+        chunk = order_ids[start:start + SQS_BATCH_SIZE]
+        result = _SQS.send_message_batch(
+            QueueUrl=queue_url,
+            Entries=[
+                {
+                    "Id": str(order_id),
+                    "MessageBody": orjson.dumps({"order_id": order_id}).decode(),
+                }
+                for order_id in chunk
+            ]
+        )
+        for failed in result.get("Failed", []):
+            log.error("[SQS ERROR] Failed to send message for order %s: %s", failed["Id"], failed.get("Message"))
+        log.info("[SQS] Messages sent for order_ids=%s", chunk)
 
 
 # ============================================================
@@ -249,44 +321,71 @@ def send_to_sqs(order_id):
 
 def lambda_handler(event, context):
     # 1. 解析请求 body
+    #    API Gateway 对二进制 / 非 JSON Content-Type 的请求会把 body 做 base64：
+    #    解码出来的 bytes 直接交给 orjson（它接受 bytes，不用再 decode 成 str）
     try:
-        body = json.loads(event.get("body") or "{}")
-    except json.JSONDecodeError:
+        raw = event.get("body") or "{}"
+        if event.get("isBase64Encoded"):
+            raw = base64.b64decode(raw, validate=True)
+        body = orjson.loads(raw)
+    except (binascii.Error, orjson.JSONDecodeError):
         return response(400, {"error": "Request body must be valid JSON"})
 
     # 2. 验证输入
-    data, errors = validate_input(body)
+    #    body 是列表 = 批量下单：每一条都要通过验证，错误信息前面标上是第几条
+    bulk = isinstance(body, list)
+    if bulk and not body:
+        return response(400, {"error": "Request body must not be an empty list"})
+
+    orders, errors = [], []
+    for i, item in enumerate(body if bulk else [body]):
+        if not isinstance(item, dict):
+            errors.append(f"orders[{i}] must be an object" if bulk else "Request body must be a JSON object")
+            continue
+        data, item_errors = validate_input(item)
+        if item_errors:
+            errors.extend(f"orders[{i}]: {e}" if bulk else e for e in item_errors)
+        else:
+            orders.append(data)
     if errors:
         return response(400, {"error": "Validation failed", "details": errors})
 
-    # 3. 存到 RDS（patient → provider → order，用事务保证原子性）
-    conn = None
+    # 3. 存到 RDS（patient → provider → order，用事务保证原子性；批量时整批一个事务）
+    #    连接在 warm 调用之间复用，不在这里 close；with conn 保证每次请求结束时事务已经提交或回滚
     try:
-        conn = get_db_connection()
-        with conn:                          # with 块结束自动 commit；异常时自动 rollback
-            with conn.cursor() as cursor:
-                patient_id  = upsert_patient(cursor, data["patient"])
-                provider_id = upsert_provider(cursor, data["provider"])
-                order_id    = insert_order(cursor, patient_id, provider_id, data)
+        try:
+            order_ids = save_orders(get_db_connection(), orders)
+        except (psycopg2.OperationalError, psycopg2.InterfaceError) as e:
+            # 复用的连接第一次用就失败，多半是 warm 期间被断开了：重连一次再试
+            # （事务没提交，重试不会重复插入）
+            log.warning("[WARN] Stale DB connection, reconnecting: %s", e)
+            reset_db_connection()
+            order_ids = save_orders(get_db_connection(), orders)
 
     except Exception as e:
-        print(f"[DB ERROR] {str(e)}")
+        log.error("[DB ERROR] %s", e)
         return response(500, {"error": "Database error, please try again later"})
-    finally:
-        if conn:
-            conn.close()
 
-    # 4. 发消息到 SQS
+    # 4. 发消息到 SQS（批量时每 10 条一个请求）
     try:
-        send_to_sqs(order_id)
+        if bulk:
+            send_to_sqs_batch(order_ids)
+        else:
+            send_to_sqs(order_ids[0])
     except Exception as e:
         # SQS 失败不应该让已经存好的订单消失
         # 这里只记录日志，order 还在 DB 里，后续可以补偿
-        print(f"[SQS ERROR] Failed to send message for order {order_id}: {str(e)}")
+        log.error("[SQS ERROR] Failed to send message for orders %s: %s", order_ids, e)
 
     # 5. 返回成功
+    if bulk:
+        return response(202, {
+            "message": "Orders accepted",
+            "order_ids": order_ids,
+            "status": "pending"
+        })
     return response(202, {
         "message": "Order accepted",
-        "order_id": order_id,
+        "order_id": order_ids[0],
         "status": "pending"
     })